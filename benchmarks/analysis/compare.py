@@ -0,0 +1,227 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import os
+import sys
+import json
+import click
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.results_log import load_run, find_runs
+from common.pricing import PricingModel
+from phases import stats_frame
+from plots import create_compare_cdf_plot
+
+# Bump when the metrics change, to invalidate the cached ones
+METRICS_VERSION = 2
+QUANTILES = np.linspace(0, 100, 101)
+
+
+def _quantiles(values):
+    return np.percentile(values, QUANTILES).tolist() if len(values) else []
+
+
+def run_metrics(res):
+    """
+    Normalizes a flops or object storage run into comparable metrics:
+    per-worker GFLOPS or MB/s, aggregate GFLOPS or GB/s, and the startup
+    latency of the functions, from the start of the run to the start of
+    the function code
+    """
+    tstamps = stats_frame(res['worker_stats'])
+    startup = (tstamps.worker_func_start_tstamp - res['start_time']).dropna().values
+    billed = (tstamps.worker_end_tstamp - tstamps.worker_start_tstamp).dropna().values
+    results = [r for r in res['results'] if r is not None]
+
+    metrics = {'functions': len(res['worker_stats']),
+               'startup_p50': float(np.median(startup)) if len(startup) else None,
+               'startup_p90': float(np.percentile(startup, 90)) if len(startup) else None,
+               'startup_quantiles': _quantiles(startup),
+               'billed_seconds': float(billed.sum()),
+               'cost': res['cost']['total_cost'] if res.get('cost') else None}
+
+    if results and 'flops' in results[0] and 'loopcount' in res:
+        gflops = np.array([r['flops'] for r in results]) / 1e9
+        est_flops = res.get('est_flops', len(results) * 2 * res['loopcount'] * res['MATN'] ** 3)
+        metrics.update({'kind': 'flops',
+                        'worker_gflops_p50': float(np.median(gflops)),
+                        'worker_gflops_mean': float(gflops.mean()),
+                        'worker_gflops_quantiles': _quantiles(gflops),
+                        'aggregate_gflops': est_flops / 1e9 / res['total_time'],
+                        'gflop': est_flops / 1e9})
+    elif results and 'mb_rate' in results[0]:
+        mb_rates = np.array([r['mb_rate'] for r in results])
+        bytes_total = sum(r.get('bytes_read', r['mb_rate'] * 1e6 * (r['end_time'] - r['start_time'])) for r in results)
+        span = max(r['end_time'] for r in results) - min(r['start_time'] for r in results)
+        metrics.update({'kind': 'read' if 'bytes_read' in results[0] else 'write',
+                        'worker_mbs_p50': float(np.median(mb_rates)),
+                        'worker_mbs_quantiles': _quantiles(mb_rates),
+                        'aggregate_gbs': bytes_total / span / 1e9 if span > 0 else 0.0,
+                        'gb': bytes_total / 1e9})
+    else:
+        metrics['kind'] = 'unknown'
+
+    return metrics
+
+
+class MetricsCache(object):
+    """
+    JSON cache of the metrics of every run, keyed by its path and
+    invalidated when the file changes, so runs are only loaded when
+    their metrics are not cached yet
+    """
+
+    def __init__(self, path):
+        self.path = os.path.expanduser(path) if '~' in path else path
+        self.entries = {}
+        self.changed = False
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.entries = json.load(f)
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        key = [st.st_mtime, st.st_size, METRICS_VERSION]
+        entry = self.entries.get(path)
+        if entry is None or entry['key'] != key:
+            entry = {'key': key, 'metrics': run_metrics(load_run(path))}
+            self.entries[path] = entry
+            self.changed = True
+        return entry['metrics']
+
+    def save(self):
+        if self.changed:
+            with open(self.path, 'w') as f:
+                json.dump(self.entries, f)
+
+
+def add_costs(table, prices):
+    """
+    Fills in the cost of the runs which did not record it, billing the time
+    from the start to the end of every worker, and adds the cost per GFLOP
+    or GB transferred. prices maps each provider to the fields of
+    common.pricing.PricingModel, plus the 'memory_mb' and 'vcpus' of its functions.
+    """
+    def cost(row):
+        if not pd.isna(row['cost']):
+            return row['cost']
+        price = dict(prices.get(row['provider'], {}))
+        if 'memory_mb' not in price:
+            return np.nan
+        memory_gb = price.pop('memory_mb') / 1024
+        vcpus = price.pop('vcpus', 1)
+        model = PricingModel(**price)
+        return (row['billed_seconds'] * (memory_gb * model.gb_second + vcpus * model.vcpu_second)
+                + row['functions'] * model.request)
+
+    table['cost'] = table.apply(cost, axis=1)
+    if 'gflop' in table:
+        table['cost_per_gflop'] = table['cost'] / table['gflop']
+    if 'gb' in table:
+        table['cost_per_gb'] = table['cost'] / table['gb']
+    return table
+
+
+def ranked(table, metric, ascending=False):
+    table = table.sort_values(metric, ascending=ascending).reset_index(drop=True)
+    table.index = table.index + 1
+    table.index.name = 'rank'
+    return table
+
+
+FLOPS_COLUMNS = ['run', 'functions', 'worker_gflops_p50', 'aggregate_gflops', 'startup_p50', 'startup_p90',
+                 'cost', 'cost_per_gflop']
+STORAGE_COLUMNS = ['run', 'functions', 'worker_mbs_p50', 'aggregate_gbs', 'startup_p50', 'startup_p90',
+                   'cost', 'cost_per_gb']
+
+
+def compare(paths, cache_path, prices=None):
+    """
+    Returns the metrics of all the runs in paths, as a dict of
+    ranked tables: flops runs and object storage write and read runs
+    """
+    cache = MetricsCache(cache_path)
+    rows = []
+    for label, path in find_runs(paths):
+        metrics = dict(cache.get(path))
+        metrics['run'] = label
+        metrics['provider'] = label.split('/')[0]
+        rows.append(metrics)
+    cache.save()
+
+    if not rows:
+        return {}
+    runs = add_costs(pd.DataFrame(rows), prices or {})
+
+    tables = {}
+    flops = runs[runs.kind == 'flops']
+    if len(flops):
+        tables['flops'] = ranked(flops.reindex(columns=FLOPS_COLUMNS + ['provider', 'worker_gflops_quantiles',
+                                                                        'startup_quantiles']), 'worker_gflops_p50')
+    for kind in ['write', 'read']:
+        storage = runs[runs.kind == kind]
+        if len(storage):
+            tables[kind] = ranked(storage.reindex(columns=STORAGE_COLUMNS + ['provider', 'worker_mbs_quantiles',
+                                                                             'startup_quantiles']), 'aggregate_gbs')
+    return tables
+
+
+@click.command()
+@click.argument('paths', nargs=-1)
+@click.option('--outdir', default=None, help='dir to save the ranked tables and the overlay plots in')
+@click.option('--name', default='compare', help='filename prefix to save results in')
+@click.option('--cache', 'cache_path', default='.compare_cache.json', help='file where the metrics of every run are cached')
+@click.option('--prices', 'prices_path', default=None, help='JSON file with the prices and the memory_mb of every provider, for runs which did not record their cost')
+def compare_command(paths, outdir, name, cache_path, prices_path):
+    """
+    Compares the benchmark runs in PATHS (result logs, pickles, provider
+    directories or benchmark directories). Defaults to all the flops and
+    object storage runs of this repository.
+    """
+    if not paths:
+        base = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+        paths = [os.path.join(base, 'flops'), os.path.join(base, 'object_storage')]
+    prices = None
+    if prices_path is not None:
+        with open(prices_path) as f:
+            prices = json.load(f)
+
+    tables = compare(paths, cache_path, prices)
+    for kind, table in tables.items():
+        columns = FLOPS_COLUMNS if kind == 'flops' else STORAGE_COLUMNS
+        columns = [c for c in columns if table[c].notna().any()]
+        print('{} runs'.format(kind.capitalize()))
+        print(table[columns].to_string(float_format='{:.4g}'.format))
+        print()
+
+        if outdir is not None:
+            table[columns].to_csv('{}/{}_{}.csv'.format(outdir, name, kind))
+            if kind == 'flops':
+                create_compare_cdf_plot(table, 'worker_gflops_quantiles', 'GFLOPS per worker',
+                                        '{}/{}_flops_gflops.png'.format(outdir, name))
+            else:
+                create_compare_cdf_plot(table, 'worker_mbs_quantiles', '{} MB/sec per function'.format(kind.capitalize()),
+                                        '{}/{}_{}_mbs.png'.format(outdir, name, kind))
+            create_compare_cdf_plot(table, 'startup_quantiles', 'Startup latency (sec)',
+                                    '{}/{}_{}_startup.png'.format(outdir, name, kind))
+
+
+if __name__ == "__main__":
+    compare_command()
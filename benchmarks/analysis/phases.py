@@ -0,0 +1,135 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import os
+import sys
+import click
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.results_log import load_run, find_runs
+from plots import create_phase_breakdown_plot
+
+# Every phase of an invocation is delimited by two lithops stats timestamps
+PHASES = [('host_submit', 'host_job_create_tstamp', 'host_submit_tstamp'),
+          ('queue_cold_start', 'host_submit_tstamp', 'worker_start_tstamp'),
+          ('runtime_setup', 'worker_start_tstamp', 'worker_func_start_tstamp'),
+          ('function_exec', 'worker_func_start_tstamp', 'worker_func_end_tstamp'),
+          ('result_upload', 'worker_func_end_tstamp', 'worker_end_tstamp'),
+          ('result_retrieval', 'worker_end_tstamp', 'host_result_done_tstamp')]
+PHASE_NAMES = [phase for phase, _, _ in PHASES]
+TSTAMPS = ['host_job_create_tstamp', 'host_submit_tstamp', 'worker_start_tstamp',
+           'worker_func_start_tstamp', 'worker_func_end_tstamp', 'worker_end_tstamp', 'host_result_done_tstamp']
+
+# Stats names used by older lithops versions
+LEGACY_STATS = {'start_time': 'worker_start_tstamp',
+                'function_start_time': 'worker_func_start_tstamp',
+                'function_end_time': 'worker_func_end_tstamp',
+                'end_time': 'worker_end_tstamp'}
+
+
+def stats_frame(worker_stats):
+    """
+    Returns a DataFrame with the timestamps of every invocation, renaming
+    the stats of older lithops versions. Missing timestamps are NaN.
+    """
+    df = pd.DataFrame(worker_stats)
+    df = df.rename(columns={k: v for k, v in LEGACY_STATS.items() if v not in df.columns})
+    return df.reindex(columns=TSTAMPS + ['worker_cold_start']).astype({t: np.float64 for t in TSTAMPS})
+
+
+def phase_breakdown(worker_stats):
+    """
+    Splits every invocation into phases and returns their durations in
+    seconds, along with the invocation total: the span from its first to
+    its last known timestamp. Phases measured between host and worker
+    timestamps include the clock skew between both machines.
+    """
+    tstamps = stats_frame(worker_stats)
+    phases = pd.DataFrame({phase: tstamps[end] - tstamps[start] for phase, start, end in PHASES})
+    first = tstamps[TSTAMPS].bfill(axis=1).iloc[:, 0]
+    last = tstamps[TSTAMPS].ffill(axis=1).iloc[:, -1]
+    phases['total'] = last - first
+    phases['cold_start'] = tstamps['worker_cold_start']
+    return phases
+
+
+def phase_summary(phases, percentiles=(50, 90, 99)):
+    """
+    Returns the distribution of every phase, and the share of the
+    aggregate invocation time it accounts for
+    """
+    rows = []
+    total = phases['total'].sum()
+    for phase in PHASE_NAMES + ['total']:
+        values = phases[phase].dropna()
+        row = {'phase': phase, 'count': len(values)}
+        if len(values):
+            row['mean'] = values.mean()
+            for q in percentiles:
+                row['p{}'.format(q)] = np.percentile(values, q)
+            row['max'] = values.max()
+            row['share'] = values.sum() / total if total > 0 else np.nan
+        rows.append(row)
+    return pd.DataFrame(rows).set_index('phase')
+
+
+def outside_user_code_share(phases):
+    """
+    Fraction of the aggregate invocation time not spent running the function
+    """
+    valid = phases[['function_exec', 'total']].dropna()
+    total = valid['total'].sum()
+    return 1 - valid['function_exec'].sum() / total if total > 0 else np.nan
+
+
+def analyze(paths):
+    summaries = {}
+    for label, path in find_runs(paths):
+        res = load_run(path)
+        phases = phase_breakdown(res['worker_stats'])
+        summary = phase_summary(phases)
+        outside = outside_user_code_share(phases)
+        summaries[label] = (summary, outside)
+
+        note = '' if phases['host_submit'].notna().any() else ' (worker timestamps only)'
+        print('{} - {} invocations - {:.1%} of the time outside user code{}'.format(label, len(phases), outside, note))
+        print(summary.round(3).to_string())
+        print()
+
+    return summaries
+
+
+@click.command()
+@click.argument('paths', nargs=-1, required=True)
+@click.option('--outdir', default=None, help='dir to save the summary CSV and plot in')
+@click.option('--name', default='phases', help='filename to save results in')
+def phases_command(paths, outdir, name):
+    """
+    Breaks down the invocations of the benchmark runs in PATHS (result logs,
+    pickles or directories containing them) into phases
+    """
+    summaries = analyze(paths)
+    if outdir is not None and summaries:
+        table = pd.concat({label: summary for label, (summary, _) in summaries.items()}, names=['run'])
+        table.to_csv('{}/{}.csv'.format(outdir, name))
+        create_phase_breakdown_plot(summaries, '{}/{}.png'.format(outdir, name))
+
+
+if __name__ == "__main__":
+    phases_command()
@@ -0,0 +1,82 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import os
+import pylab
+import logging
+import numpy as np
+
+pylab.switch_backend("Agg")
+logger = logging.getLogger(__name__)
+
+
+def create_phase_breakdown_plot(summaries, dst):
+    """
+    Stacked bars with the mean duration of every phase of each run
+    """
+    labels = list(summaries)
+    phase_names = [p for p in summaries[labels[0]][0].index if p != 'total']
+    fig = pylab.figure(figsize=(8, max(3, 0.4 * len(labels) + 1.5)))
+    ax = fig.add_subplot(1, 1, 1)
+
+    left = np.zeros(len(labels))
+    for phase in phase_names:
+        means = np.array([summaries[l][0]['mean'].get(phase, np.nan) for l in labels])
+        means = np.nan_to_num(np.maximum(means, 0))
+        ax.barh(labels, means, left=left, label=phase, edgecolor='k', linewidth=0.5)
+        left += means
+
+    ax.set_xlabel('Mean time per invocation (sec)')
+    ax.invert_yaxis()
+    ax.legend(loc='lower right', fontsize='small')
+    ax.grid(True, axis='x')
+
+    dst = os.path.expanduser(dst) if '~' in dst else dst
+
+    fig.tight_layout()
+    fig.savefig(dst)
+    pylab.close(fig)
+
+
+def create_compare_cdf_plot(table, quantiles_column, xlabel, dst):
+    """
+    Overlays the CDFs of a metric of several runs, from their quantiles
+    """
+    fig = pylab.figure(figsize=(6, 5))
+    ax = fig.add_subplot(1, 1, 1)
+    x_max = 0
+    for i, (_, row) in enumerate(table.iterrows()):
+        quantiles = row[quantiles_column]
+        if isinstance(quantiles, list) and quantiles:
+            linestyle = ['solid', 'dashed', 'dotted'][i // 10 % 3]
+            ax.plot(quantiles, np.linspace(0, 1, len(quantiles)), label=row['run'], linestyle=linestyle)
+            x_max = max(x_max, quantiles[-2])
+
+    # Zoom to the 99th percentiles, so a few outliers do not squeeze the CDFs
+    if x_max > 0:
+        ax.set_xlim(0, x_max * 1.1)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel('CDF')
+    ax.set_ylim(0, 1.02)
+    ax.legend(loc='lower right', fontsize='x-small')
+    ax.grid(True)
+
+    dst = os.path.expanduser(dst) if '~' in dst else dst
+
+    fig.tight_layout()
+    fig.savefig(dst)
+    pylab.close(fig)
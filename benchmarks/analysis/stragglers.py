@@ -0,0 +1,148 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import os
+import sys
+import json
+import click
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.results_log import load_run, find_runs
+from phases import stats_frame
+
+
+def _value(x):
+    x = float(x)
+    return None if np.isnan(x) else x
+
+
+def rank_correlation(x, y):
+    """
+    Spearman correlation, computed as the Pearson correlation of the ranks
+    """
+    return pd.Series(x).rank().corr(pd.Series(y).rank())
+
+
+def invocation_waves(start_times, wave_gap):
+    """
+    Numbers the invocation waves: a new wave starts whenever no function
+    started during the previous wave_gap seconds
+    """
+    order = np.argsort(start_times)
+    gaps = np.diff(start_times[order], prepend=start_times[order][0]) > wave_gap
+    waves = np.empty(len(start_times), dtype=np.int64)
+    waves[order] = np.cumsum(gaps)
+    return waves
+
+
+def straggler_report(res, percentile=95, wave_gap=1.0):
+    """
+    Flags as stragglers the functions whose execution time is above the
+    given percentile, and estimates the makespan of the job (from its start
+    to the end of its last function) if they had not been stragglers:
+    either dropping them, or capping their execution time to the percentile.
+    """
+    tstamps = stats_frame(res['worker_stats'])
+    tstamps = tstamps.dropna(subset=['worker_start_tstamp', 'worker_func_start_tstamp',
+                                     'worker_func_end_tstamp', 'worker_end_tstamp'])
+    start_time = res.get('start_time', tstamps.worker_start_tstamp.min())
+
+    exec_time = (tstamps.worker_func_end_tstamp - tstamps.worker_func_start_tstamp).values
+    start = (tstamps.worker_start_tstamp - start_time).values
+    end = (tstamps.worker_end_tstamp - start_time).values
+
+    threshold = np.percentile(exec_time, percentile)
+    stragglers = exec_time > threshold
+    makespan = end.max()
+    makespan_dropped = end[~stragglers].max() if (~stragglers).any() else 0.0
+    makespan_capped = (end - np.maximum(exec_time - threshold, 0)).max()
+
+    waves = invocation_waves(start, wave_gap)
+    wave_rows = []
+    for wave in np.unique(waves):
+        in_wave = waves == wave
+        wave_rows.append({'wave': int(wave),
+                          'functions': int(in_wave.sum()),
+                          'stragglers': int(stragglers[in_wave].sum()),
+                          'first_start': _value(start[in_wave].min()),
+                          'median_exec_time': _value(np.median(exec_time[in_wave]))})
+
+    cold_start = tstamps.worker_cold_start
+    by_cold_start = {}
+    if cold_start.notna().any():
+        for label, mask in [('cold', (cold_start == True).values), ('warm', (cold_start == False).values)]:
+            if mask.any():
+                by_cold_start[label] = {'functions': int(mask.sum()),
+                                        'straggler_fraction': _value(stragglers[mask].mean())}
+
+    return {'functions': len(exec_time),
+            'percentile': percentile,
+            'exec_time_threshold': _value(threshold),
+            'exec_time': {'p50': _value(np.percentile(exec_time, 50)),
+                          'p90': _value(np.percentile(exec_time, 90)),
+                          'p99': _value(np.percentile(exec_time, 99)),
+                          'max': _value(exec_time.max())},
+            'stragglers': int(stragglers.sum()),
+            'makespan': _value(makespan),
+            'makespan_without_stragglers': _value(makespan_dropped),
+            'makespan_stragglers_capped': _value(makespan_capped),
+            'saved_time': _value(makespan - makespan_capped),
+            'saved_fraction': _value((makespan - makespan_capped) / makespan) if makespan > 0 else None,
+            'start_exec_correlation': _value(rank_correlation(start, exec_time)),
+            'straggler_start_correlation': _value(rank_correlation(start, stragglers)),
+            'waves': wave_rows,
+            'by_cold_start': by_cold_start}
+
+
+@click.command()
+@click.argument('paths', nargs=-1, required=True)
+@click.option('--percentile', default=95.0, help='execution time percentile above which a function is a straggler', type=float)
+@click.option('--wave_gap', default=1.0, help='seconds without new functions starting which separate two invocation waves', type=float)
+@click.option('--output', '-o', default=None, help='JSON file to save the summary in, printed if not set')
+@click.option('--max_saved_fraction', default=None, help='exit with an error if capping the stragglers saves more than this fraction of any makespan', type=float)
+def stragglers_command(paths, percentile, wave_gap, output, max_saved_fraction):
+    """
+    Analyzes the stragglers of the benchmark runs in PATHS (result logs,
+    pickles or directories containing them)
+    """
+    summary = {}
+    for label, path in find_runs(paths):
+        report = straggler_report(load_run(path), percentile, wave_gap)
+        summary[label] = report
+        print('{} - {} stragglers of {} functions above {}s - makespan {}s, {}s with stragglers capped'.format(
+            label, report['stragglers'], report['functions'], round(report['exec_time_threshold'], 3),
+            round(report['makespan'], 3), round(report['makespan_stragglers_capped'], 3)), file=sys.stderr)
+
+    if output is None:
+        print(json.dumps(summary, indent=2))
+    else:
+        output = os.path.expanduser(output) if '~' in output else output
+        with open(output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    if max_saved_fraction is not None:
+        failed = [label for label, report in summary.items()
+                  if report['saved_fraction'] is not None and report['saved_fraction'] > max_saved_fraction]
+        if failed:
+            raise click.ClickException('Stragglers above {:.1%} of the makespan in: {}'.format(
+                max_saved_fraction, ', '.join(failed)))
+
+
+if __name__ == "__main__":
+    stragglers_command()
@@ -0,0 +1,71 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import os
+import pylab
+import numpy as np
+
+from common.timeline import MAX_TIMELINE_LINES, timeline, draw_function_timelines
+
+pylab.switch_backend("Agg")
+
+
+def create_execution_histogram(benchmark_data, dst, max_lines=MAX_TIMELINE_LINES):
+    """
+    Plots the timeline of every function of a run and the number of
+    functions running over time
+    """
+    start_time = benchmark_data['start_time']
+    time_rates = [(f['worker_start_tstamp'], f['worker_end_tstamp']) for f in benchmark_data['worker_stats']]
+    total_calls = len(time_rates)
+
+    max_seconds = int(max([tr[1]-start_time for tr in time_rates])*1.1)
+    max_seconds = max(8 * round(max_seconds/8), 8)
+
+    runtime_bins = np.linspace(0, max_seconds, max_seconds)
+    x = np.array(time_rates) - start_time
+    runtime_calls = timeline(runtime_bins, x[:, 0], x[:, 1])
+
+    fig = pylab.figure(figsize=(5, 5))
+    ax = fig.add_subplot(1, 1, 1)
+
+    draw_function_timelines(ax, x[:, 0], x[:, 1], max_seconds, max_lines)
+    ax.plot(runtime_bins, runtime_calls, label='Parallel Functions', zorder=-1)
+
+    yplot_step = int(np.max([1, total_calls/20]))
+    y_ticks = np.arange(total_calls//yplot_step + 2) * yplot_step
+    ax.set_yticks(y_ticks)
+    ax.set_ylim(-0.02*total_calls, total_calls*1.02)
+
+    xplot_step = max(int(max_seconds/8), 1)
+    x_ticks = np.arange(int(max_seconds//xplot_step)+1) * xplot_step
+    ax.set_xlim(0, max_seconds)
+    ax.set_xticks(x_ticks)
+    for x in x_ticks:
+        ax.axvline(x, c='k', alpha=0.2, linewidth=0.8)
+
+    ax.set_xlabel("Execution Time (sec)")
+    ax.set_ylabel("Function Call")
+    ax.grid(False)
+    ax.legend(loc='upper right')
+
+    fig.tight_layout()
+
+    dst = os.path.expanduser(dst) if '~' in dst else dst
+
+    fig.savefig(dst)
+    pylab.close(fig)
@@ -0,0 +1,160 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import os
+import json
+import math
+
+# On-demand list prices in USD at the time of writing, for the default
+# region of every provider. Check the current prices of your region and
+# override them with a JSON file in the LITHOPS_BENCHMARK_PRICES environment
+# variable, mapping backend names to the fields of PricingModel.
+COMPUTE_PRICES = {
+    'aws_lambda': {'gb_second': 0.0000166667, 'request': 0.0000002, 'granularity_ms': 1},
+    'gcp_functions': {'gb_second': 0.0000025, 'vcpu_second': 0.000024, 'request': 0.0000004, 'granularity_ms': 100},
+    'gcp_cloudrun': {'gb_second': 0.0000025, 'vcpu_second': 0.000024, 'request': 0.0000004, 'granularity_ms': 100},
+    'azure_functions': {'gb_second': 0.000016, 'request': 0.0000002, 'granularity_ms': 1},
+    'ibm_cf': {'gb_second': 0.000017, 'granularity_ms': 100},
+    'code_engine': {'gb_second': 0.00000356, 'vcpu_second': 0.00003431, 'granularity_ms': 1000},
+    'aliyun_fc': {'gb_second': 0.000016384, 'request': 0.0000002, 'granularity_ms': 1},
+}
+
+STORAGE_PRICES = {
+    'aws_s3': {'put_request': 0.000005, 'get_request': 0.0000004},
+    'gcp_storage': {'put_request': 0.000005, 'get_request': 0.0000004},
+    'azure_storage': {'put_request': 0.0000065, 'get_request': 0.0000005},
+    'ibm_cos': {'put_request': 0.000005, 'get_request': 0.0000004},
+    'aliyun_oss': {'put_request': 0.000001, 'get_request': 0.000001},
+}
+
+PRICES_ENV = 'LITHOPS_BENCHMARK_PRICES'
+
+
+def load_prices():
+    """
+    Returns the compute and storage prices, updated with the ones of the
+    file in the LITHOPS_BENCHMARK_PRICES environment variable, if set
+    """
+    compute_prices = {k: dict(v) for k, v in COMPUTE_PRICES.items()}
+    storage_prices = {k: dict(v) for k, v in STORAGE_PRICES.items()}
+    path = os.environ.get(PRICES_ENV)
+    if path:
+        with open(os.path.expanduser(path)) as f:
+            for name, prices in json.load(f).items():
+                target = storage_prices if name in storage_prices or 'put_request' in prices else compute_prices
+                target.setdefault(name, {}).update(prices)
+    return compute_prices, storage_prices
+
+
+class PricingModel(object):
+    """
+    Per-provider pricing of a map job: billed GB-seconds and vCPU-seconds,
+    per-invocation requests and object storage PUT/GET requests.
+    Durations are rounded up to the billing granularity of the provider.
+    """
+
+    def __init__(self, gb_second=0.0, vcpu_second=0.0, request=0.0, put_request=0.0, get_request=0.0,
+                 granularity_ms=1):
+        self.gb_second = gb_second
+        self.vcpu_second = vcpu_second
+        self.request = request
+        self.put_request = put_request
+        self.get_request = get_request
+        self.granularity_ms = granularity_ms
+
+    @classmethod
+    def for_backends(cls, backend, storage=None):
+        compute_prices, storage_prices = load_prices()
+        if backend not in compute_prices:
+            raise ValueError('No prices for the {} compute backend, add them to the file in the {} '
+                             'environment variable'.format(backend, PRICES_ENV))
+        prices = dict(compute_prices[backend])
+        prices.update(storage_prices.get(storage, {}))
+        return cls(**prices)
+
+    def billed_seconds(self, stats):
+        if 'worker_exec_time' in stats:
+            seconds = stats['worker_exec_time']
+        else:
+            seconds = stats['worker_end_tstamp'] - stats['worker_start_tstamp']
+        return math.ceil(seconds * 1000 / self.granularity_ms) * self.granularity_ms / 1000
+
+    def run_cost(self, worker_stats, memory_mb, vcpus=1, puts=0, gets=0, gflop=None, gb=None):
+        """
+        Returns the cost of the invocations of a job, its cost per invocation
+        and, given the GFLOP computed or the GB transferred, per GFLOP or GB
+        """
+        seconds = sum(self.billed_seconds(stats) for stats in worker_stats)
+        compute_cost = seconds * (memory_mb / 1024 * self.gb_second + vcpus * self.vcpu_second)
+        request_cost = len(worker_stats) * self.request
+        storage_cost = puts * self.put_request + gets * self.get_request
+        total_cost = compute_cost + request_cost + storage_cost
+
+        cost = {'billed_seconds': seconds,
+                'memory_mb': memory_mb,
+                'vcpus': vcpus,
+                'compute_cost': compute_cost,
+                'request_cost': request_cost,
+                'storage_request_cost': storage_cost,
+                'total_cost': total_cost,
+                'cost_per_invocation': total_cost / len(worker_stats) if worker_stats else None}
+        if gflop is not None:
+            cost['cost_per_gflop'] = total_cost / gflop if gflop > 0 else None
+        if gb is not None:
+            cost['cost_per_gb'] = total_cost / gb if gb > 0 else None
+        return cost
+
+
+def executor_cost(fexec, futures, memory_mb=None, puts=0, gets=0, gflop=None, gb=None):
+    """
+    Prices the finished futures of a FunctionExecutor with the prices of its
+    compute and storage backends. Returns None if there are no prices for them.
+    """
+    backend = fexec.backend
+    backend_config = fexec.config.get(backend, {})
+    try:
+        model = PricingModel.for_backends(backend, fexec.config['lithops'].get('storage'))
+    except ValueError as e:
+        print(e)
+        return None
+    memory_mb = memory_mb or backend_config.get('runtime_memory', 256)
+    vcpus = backend_config.get('runtime_cpu', 1)
+    worker_stats = [f.stats for f in futures if not f.error]
+    return model.run_cost(worker_stats, memory_mb, vcpus, puts, gets, gflop, gb)
+
+
+def transferred_gb(results):
+    """
+    GB downloaded and uploaded by the functions of a run, from the
+    download_size and upload_size (in bytes) of the measurement of every
+    result. Returns None if the functions report no transfer sizes.
+    """
+    sizes = [r['measurement'].get(k) for r in results for k in ['download_size', 'upload_size']
+             if isinstance(r, dict) and isinstance(r.get('measurement'), dict)]
+    sizes = [s for s in sizes if s is not None]
+    return sum(sizes) / 1e9 if sizes else None
+
+
+def print_cost(cost):
+    if cost is None:
+        return
+    line = 'Cost: {:.6f} USD - Per invocation: {:.8f} USD'.format(cost['total_cost'], cost['cost_per_invocation'] or 0)
+    if cost.get('cost_per_gflop') is not None:
+        line += ' - Per GFLOP: {:.3e} USD'.format(cost['cost_per_gflop'])
+    if cost.get('cost_per_gb') is not None:
+        line += ' - Per GB: {:.6f} USD'.format(cost['cost_per_gb'])
+    print(line)
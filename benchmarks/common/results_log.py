@@ -0,0 +1,152 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import glob
+import json
+import pickle
+import numpy as np
+
+# Stats needed to plot the timeline of a run, to load runs with
+# load_run(path, stats_keys=TIMELINE_STATS) when the rest are not needed
+TIMELINE_STATS = ['host_submit_tstamp', 'worker_start_tstamp', 'worker_func_start_tstamp',
+                  'worker_func_end_tstamp', 'worker_end_tstamp']
+
+
+def _to_json(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return str(obj)
+
+
+class ResultLog(object):
+    """
+    Append-only JSONL file where a benchmark run is persisted as it
+    progresses: a 'run' record with the run metadata, one 'call' record
+    per finished function call and a final 'summary' record. A previous
+    log at the same path is overwritten, so repeating a run with the
+    same name does not mix the calls of both runs.
+    """
+
+    def __init__(self, path, **metadata):
+        path = os.path.expanduser(path) if '~' in path else path
+        self.path = path
+        self.f = open(path, 'w')
+        self.append('run', **metadata)
+
+    def append(self, record_type, **fields):
+        fields['type'] = record_type
+        self.f.write(json.dumps(fields, default=_to_json) + '\n')
+        self.f.flush()
+
+    def append_call(self, f):
+        error = bool(f.error)
+        self.append('call', call_id=f.call_id, error=error,
+                    result=None if error else f.result(throw_except=False),
+                    stats=f.stats)
+
+    def close(self, **summary):
+        self.append('summary', **summary)
+        self.f.close()
+
+
+def wait_and_log(fexec, futures, log):
+    """
+    Waits for the futures, appending every call to the log as soon as it
+    finishes, so a driver crash only loses the calls still running.
+    """
+    # imported here so runs can be loaded and analyzed where lithops is not installed
+    from lithops.wait import ANY_COMPLETED
+
+    pending = list(futures)
+    while pending:
+        done, pending = fexec.wait(fs=pending, return_when=ANY_COMPLETED, download_results=True,
+                                   throw_except=False, show_progressbar=False)
+        for f in done:
+            log.append_call(f)
+
+
+def iter_records(path):
+    """
+    Lazily yields the records of a result log. A truncated last line,
+    left by a driver that crashed while writing it, is skipped.
+    """
+    with open(path) as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                if line.endswith('\n'):
+                    raise
+                return
+
+
+def load_run(path, stats_keys=None):
+    """
+    Loads a benchmark run either from a result log or from a legacy
+    pickle into the dict layout produced by the benchmarks.
+    stats_keys limits the worker stats kept to the given keys.
+    """
+    path = os.path.expanduser(path) if '~' in path else path
+    if not path.endswith('.jsonl'):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    res = {}
+    calls = []
+    for record in iter_records(path):
+        record_type = record.pop('type')
+        if record_type == 'call':
+            if stats_keys is not None:
+                record['stats'] = {k: record['stats'][k] for k in stats_keys if k in record['stats']}
+            calls.append(record)
+        else:
+            res.update(record)
+
+    calls.sort(key=lambda c: c['call_id'])
+    res['results'] = [c['result'] for c in calls if c['result'] is not None]
+    res['worker_stats'] = [c['stats'] for c in calls if not c['error']]
+
+    return res
+
+
+def find_runs(paths):
+    """
+    Expands a list of result logs, pickles or directories containing them
+    into (label, path) tuples, labelled as <directory>/<run name>.
+    Directories without runs are searched one level down, so the
+    directory of a benchmark expands to the runs of all its providers.
+    """
+    def run_files(path):
+        return sorted(glob.glob(os.path.join(path, '*.jsonl')) + glob.glob(os.path.join(path, '*.pickle')))
+
+    runs = []
+    for path in paths:
+        path = os.path.expanduser(path) if '~' in path else path
+        if os.path.isdir(path):
+            files = run_files(path)
+            if not files:
+                for subdir in sorted(glob.glob(os.path.join(path, '*', ''))):
+                    files.extend(run_files(subdir))
+        else:
+            files = [path]
+        for f in files:
+            name = os.path.splitext(os.path.basename(f))[0]
+            label = '{}/{}'.format(os.path.basename(os.path.dirname(os.path.abspath(f))), name)
+            runs.append((label, f))
+    return runs
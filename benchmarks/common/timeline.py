@@ -0,0 +1,111 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import numpy as np
+from matplotlib.collections import LineCollection
+
+# Above this number of functions the per-function timelines are drawn
+# as an occupancy image instead of one line segment per function
+MAX_TIMELINE_LINES = 10000
+
+
+def interval_bins(runtime_bins, start_times, end_times):
+    """
+    Returns, for every [start, end) interval, the first bin it covers
+    and the bin after the last one it covers, as found by searchsorted.
+    """
+    first = np.searchsorted(runtime_bins, start_times)
+    last = np.searchsorted(runtime_bins, end_times)
+    return first, last
+
+
+def timeline(runtime_bins, start_times, end_times, weights=None):
+    """
+    Returns the per-bin sum of the weights (1 by default) of all the
+    intervals covering each bin, i.e. the number of concurrent functions
+    or their aggregate throughput over time.
+
+    Every interval adds its weight at its first bin and removes it after
+    its last bin in a difference array, which is then accumulated, so it
+    takes O(N + bins) memory instead of a dense N x bins matrix.
+    """
+    n_bins = len(runtime_bins)
+    first, last = interval_bins(runtime_bins, np.asarray(start_times), np.asarray(end_times))
+    weights = np.ones(len(first)) if weights is None else np.asarray(weights, dtype=np.float64)
+
+    covered = last > first
+    diff = np.zeros(n_bins + 1)
+    np.add.at(diff, first[covered], weights[covered])
+    np.add.at(diff, last[covered], -weights[covered])
+
+    return np.cumsum(diff[:-1])
+
+
+def spread_timeline(runtime_bins, start_times, end_times, work):
+    """
+    Spreads the work done by every interval (FLOPs, bytes, items...)
+    evenly over the bins it covers, and returns the per-bin sum.
+    """
+    first, last = interval_bins(runtime_bins, np.asarray(start_times), np.asarray(end_times))
+    n_bins = np.maximum(last - first, 1)
+    work = np.broadcast_to(np.asarray(work, dtype=np.float64), n_bins.shape)
+    return timeline(runtime_bins, start_times, end_times, work / n_bins)
+
+
+def occupancy_image(start_times, end_times, max_seconds, n_rows=1000, n_cols=1000):
+    """
+    Rasterizes the [start, end) intervals of N functions into an
+    (n_rows x n_cols) image, where every row groups N / n_rows consecutive
+    function indexes and every column a slice of max_seconds / n_cols seconds.
+    Each pixel is the fraction of the functions of its row which were
+    running during its time slice.
+
+    Uses one difference array per row, so it takes O(N + n_rows x n_cols).
+    """
+    start_times = np.asarray(start_times, dtype=np.float64)
+    end_times = np.asarray(end_times, dtype=np.float64)
+    n_calls = len(start_times)
+    n_rows = max(min(n_rows, n_calls), 1)
+    col_width = max_seconds / n_cols
+
+    rows = np.arange(n_calls) * n_rows // max(n_calls, 1)
+    first = np.clip(np.floor(start_times / col_width), 0, n_cols).astype(np.int64)
+    last = np.clip(np.ceil(end_times / col_width), 0, n_cols).astype(np.int64)
+    last = np.maximum(last, np.minimum(first + 1, n_cols))
+
+    diff = np.zeros((n_rows, n_cols + 1))
+    np.add.at(diff, (rows, first), 1)
+    np.add.at(diff, (rows, last), -1)
+    calls_per_row = np.maximum(np.bincount(rows, minlength=n_rows), 1)
+
+    return np.cumsum(diff[:, :-1], axis=1) / calls_per_row[:, None]
+
+
+def draw_function_timelines(ax, start_times, end_times, max_seconds, max_lines=MAX_TIMELINE_LINES):
+    """
+    Draws a horizontal line per function from its start to its end time,
+    or, when there are more than max_lines functions, an occupancy image
+    of them which still shows the launch waves and the stragglers.
+    """
+    n_calls = len(start_times)
+    if n_calls <= max_lines:
+        y = np.arange(n_calls)
+        segments = np.stack([np.column_stack([start_times, y]), np.column_stack([end_times, y])], axis=1)
+        ax.add_collection(LineCollection(segments, linestyles='solid', color='k', alpha=0.6, linewidth=0.4))
+    else:
+        image = np.ma.masked_equal(occupancy_image(start_times, end_times, max_seconds), 0)
+        ax.imshow(image, cmap='Greys', vmin=0, vmax=1, alpha=0.6, origin='lower', aspect='auto',
+                  interpolation='nearest', extent=(0, max_seconds, 0, n_calls))
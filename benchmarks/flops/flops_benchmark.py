@@ -14,63 +14,93 @@
 # limitations under the License.
 #
 
+import os
+import sys
 import click
 import time
-import numpy as np
-import pickle as pickle
 
 from lithops import FunctionExecutor
-from plots import create_execution_histogram, create_rates_histogram, create_total_gflops_plot
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.results_log import ResultLog, wait_and_log, load_run, TIMELINE_STATS
+from common.pricing import executor_cost, print_cost
+from common.plots import create_execution_histogram
+from kernels import KERNELS, OP_UNITS, compute_kernel, estimated_ops
+from scaling import core_scaling, scaling_summary
+from iterations import iteration_report, measured_rate, print_iteration_report
+from plots import create_rates_histogram, create_total_gflops_plot, create_scaling_plot, create_iterations_plot
 
-def compute_flops(loopcount, MAT_N):
-    A = np.arange(MAT_N**2, dtype=np.float64).reshape(MAT_N, MAT_N)
-    B = np.arange(MAT_N**2, dtype=np.float64).reshape(MAT_N, MAT_N)
 
-    start = time.time()
-    for i in range(loopcount):
-        c = np.sum(np.dot(A, B))
+def benchmark(backend, storage, workers, memory, loopcount, matn, results_path, debug, kernel='gemm_f64', warmup=1):
+    iterable = [(kernel, loopcount, matn, warmup) for i in range(workers)]
+    log_level = 'INFO' if not debug else 'DEBUG'
+    fexec = FunctionExecutor(backend=backend, storage=storage, runtime_memory=memory, log_level=log_level)
+    start_time = time.time()
+    log = ResultLog(results_path, start_time=start_time, loopcount=loopcount, MATN=matn, kernel=kernel, warmup=warmup)
+    worker_futures = fexec.map(compute_kernel, iterable)
+    wait_and_log(fexec, worker_futures, log)
+    end_time = time.time()
+    total_time = end_time-start_time
+
+    print("Total time:", round(total_time, 3))
+    toal_executed_tasks = len([f for f in worker_futures if not f.error])
+    est_flops = estimated_ops(kernel, toal_executed_tasks, loopcount, matn)
+    print('Estimated G{}/s:'.format(OP_UNITS[kernel]), round(est_flops / 1e9 / total_time, 4))
+    cost = executor_cost(fexec, worker_futures, memory, gflop=est_flops / 1e9)
+    print_cost(cost)
+
+    log.close(total_time=total_time, est_flops=est_flops, workers=toal_executed_tasks, cost=cost)
+
+    res = load_results(results_path)
+    if res.get('measured_flops') is not None:
+        print('Measured G{}/s:'.format(OP_UNITS[kernel]), round(res['measured_flops'] / 1e9, 4))
+    print_iteration_report(res['iterations'], OP_UNITS[kernel])
 
-    FLOPS = 2 * MAT_N**3 * loopcount
-    
-    end = time.time()
-    
-    return {'flops': FLOPS / (end-start)}
+    return res
 
 
-def benchmark(backend, storage, workers, memory, loopcount, matn, debug):
-    iterable = [(loopcount, matn) for i in range(workers)]
+def scaling_benchmark(backend, storage, workers, memory, loopcount, matn, results_path, debug, kernel='gemm_f64'):
+    """
+    Runs the core scaling mode of the benchmark in functions of the given memory
+    """
+    iterable = [(loopcount, matn, kernel) for i in range(workers)]
     log_level = 'INFO' if not debug else 'DEBUG'
     fexec = FunctionExecutor(backend=backend, storage=storage, runtime_memory=memory, log_level=log_level)
     start_time = time.time()
-    worker_futures = fexec.map(compute_flops, iterable)
-    results = fexec.get_result(throw_except=False)
+    log = ResultLog(results_path, start_time=start_time, loopcount=loopcount, MATN=matn, kernel=kernel, memory=memory)
+    worker_futures = fexec.map(core_scaling, iterable)
+    wait_and_log(fexec, worker_futures, log)
     end_time = time.time()
-    results = [flops for flops in results if flops is not None]
-    worker_stats = [f.stats for f in worker_futures if not f.error]
     total_time = end_time-start_time
-    
-    print("Total time:", round(total_time, 3))
-    toal_executed_tasks = len(worker_stats)
-    est_flops = toal_executed_tasks * 2 * loopcount * matn ** 3
-    print('Estimated GFLOPS:', round(est_flops / 1e9 / total_time, 4))
-
-    res = {'start_time': start_time,
-           'total_time': total_time,
-           'est_flops': est_flops,
-           'worker_stats': worker_stats,
-           'results': results,
-           'workers': toal_executed_tasks,
-           'loopcount': loopcount,
-           'MATN': matn}
 
+    print("Total time:", round(total_time, 3))
+    cost = executor_cost(fexec, worker_futures, memory)
+    print_cost(cost)
+    log.close(total_time=total_time, cost=cost)
+
+    return load_run(results_path)
+
+
+def load_results(path):
+    """
+    Loads a run from its result log or legacy pickle. The FLOPs estimate
+    of runs whose driver crashed is derived from the calls logged.
+    """
+    res = load_run(path, stats_keys=TIMELINE_STATS)
+    res.setdefault('workers', len(res['worker_stats']))
+    res.setdefault('est_flops', estimated_ops(res.get('kernel', 'gemm_f64'), res['workers'], res['loopcount'], res['MATN']))
+    res['measured_flops'] = measured_rate(res)
+    res['iterations'] = iteration_report(res)
     return res
 
 
 def create_plots(data, outdir, name):
+    unit = OP_UNITS[data.get('kernel', 'gemm_f64')]
     create_execution_histogram(data, "{}/{}_execution.png".format(outdir, name))
-    create_rates_histogram(data, "{}/{}_rates.png".format(outdir, name))
-    create_total_gflops_plot(data, "{}/{}_gflops.png".format(outdir, name))
+    create_rates_histogram(data, "{}/{}_rates.png".format(outdir, name), unit)
+    create_total_gflops_plot(data, "{}/{}_gflops.png".format(outdir, name), unit)
+    if data['iterations'] is not None:
+        create_iterations_plot(data, "{}/{}_iterations.png".format(outdir, name), unit)
 
 
 @click.command()
@@ -82,15 +112,39 @@ def create_plots(data, outdir, name):
 @click.option('--name', help='filename to save results in')
 @click.option('--loopcount', default=6, help='Number of matmuls to do.', type=int)
 @click.option('--matn', default=1024, help='size of matrix', type=int)
+@click.option('--kernels', default='gemm_f64', help='comma-separated kernels to run, from: {}'.format(', '.join(KERNELS)))
+@click.option('--warmup', default=1, help='Number of untimed iterations before the timed ones.', type=int)
+@click.option('--scaling', is_flag=True, help='measure how the kernel scales with the cores of every function')
+@click.option('--memory_sizes', default=None, help='comma-separated memory sizes in MB to run the scaling mode with, defaults to --memory')
 @click.option('--debug', '-d', is_flag=True, help='debug mode')
-def run_benchmark(backend, storage, tasks, memory, outdir, name, loopcount, matn, debug):
+def run_benchmark(backend, storage, tasks, memory, outdir, name, loopcount, matn, kernels, warmup, scaling, memory_sizes, debug):
     name = '{}_flops'.format(tasks) if name is None else name
-    if True:
-        res = benchmark(backend, storage, tasks, memory, loopcount, matn, debug)
-        pickle.dump(res, open(f'{outdir}/{name}.pickle', 'wb'))
-    else:
-        res = pickle.load(open(f'{outdir}/{name}.pickle', 'rb'))
-    create_plots(res, outdir, name)
+    kernels = kernels.split(',')
+    for kernel in kernels:
+        if kernel not in KERNELS:
+            raise click.BadParameter('Unknown kernel {}, choose from {}'.format(kernel, ', '.join(KERNELS)))
+
+    if scaling:
+        memory_sizes = [int(m) for m in memory_sizes.split(',')] if memory_sizes else [memory]
+        runs = {}
+        for mem in memory_sizes:
+            print('Memory: {} MB'.format(mem))
+            runs[mem] = scaling_benchmark(backend, storage, tasks, mem, loopcount, matn,
+                                          f'{outdir}/{name}_scaling_{mem}mb.jsonl', debug, kernels[0])
+        summary = scaling_summary(runs)
+        print(summary.round(3).to_string(index=False))
+        summary.to_csv(f'{outdir}/{name}_scaling.csv', index=False)
+        create_scaling_plot(summary, f'{outdir}/{name}_scaling.png')
+        return
+
+    for kernel in kernels:
+        kernel_name = name if kernel == 'gemm_f64' else '{}_{}'.format(name, kernel)
+        if True:
+            res = benchmark(backend, storage, tasks, memory, loopcount, matn, f'{outdir}/{kernel_name}.jsonl', debug, kernel,
+                            warmup)
+        else:
+            res = load_results(f'{outdir}/{kernel_name}.pickle')
+        create_plots(res, outdir, kernel_name)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,112 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import numpy as np
+import pandas as pd
+
+# Drop of the iteration rate, relative to the first iterations of a
+# function, from which it is considered throttled
+THROTTLE_DROP = 0.2
+
+
+def iteration_rates(result):
+    """
+    Returns the end of every timed iteration of a function, in seconds
+    since its timed window started, and the operation rate of every iteration
+    """
+    iter_times = np.array(result['iter_ms']) / 1000
+    return np.cumsum(iter_times), result['ops'] / iter_times
+
+
+def throttling(rates, ends, drop=THROTTLE_DROP):
+    """
+    Compares the rate of the last quarter of the iterations of a function
+    to the one of its first quarter. Returns the relative drop and, when it
+    exceeds drop, the time of the first iteration after which the rate
+    stays below the throttled threshold, as CPU credit throttling does.
+    """
+    quarter = max(len(rates) // 4, 1)
+    baseline = np.median(rates[:quarter])
+    rate_drop = 1 - np.median(rates[-quarter:]) / baseline
+    if rate_drop <= drop:
+        return rate_drop, None
+    above = np.flatnonzero(rates >= baseline * (1 - drop))
+    return rate_drop, ends[above[-1]] if len(above) else 0.0
+
+
+def iteration_report(res, drop=THROTTLE_DROP):
+    """
+    Variance and throttling analysis of the per-iteration timings of a
+    flops run. Splits the variability of the iteration rates into the one
+    within each function (turbo, throttling, noisy neighbours during the
+    run) and the one between functions (heterogeneous hosts), and flags the
+    functions whose rate dropped during the run by more than drop.
+    """
+    results = [r for r in res['results'] if r is not None and 'iter_ms' in r]
+    if not results:
+        return None
+
+    rows = []
+    for r in results:
+        ends, rates = iteration_rates(r)
+        rate_drop, throttled_at = throttling(rates, ends, drop)
+        rows.append({'median_rate': np.median(rates),
+                     'cv': rates.std() / rates.mean(),
+                     'drop': rate_drop,
+                     'throttled': throttled_at is not None,
+                     'throttled_at': throttled_at})
+    workers = pd.DataFrame(rows)
+    throttled = workers[workers.throttled]
+
+    return {'functions': len(workers),
+            'iterations': int(np.median([len(r['iter_ms']) for r in results])),
+            'warmup': results[0].get('warmup', 0),
+            'median_rate': float(workers.median_rate.median()),
+            'within_cv': float(workers.cv.median()),
+            'between_cv': float(workers.median_rate.std(ddof=0) / workers.median_rate.mean()),
+            'median_drop': float(workers['drop'].median()),
+            'throttled_functions': len(throttled),
+            'throttled_fraction': len(throttled) / len(workers),
+            'throttled_at_p50': float(throttled.throttled_at.median()) if len(throttled) else None}
+
+
+def measured_rate(res):
+    """
+    Aggregate operation rate over the timed windows of the functions,
+    excluding the invocation overhead and warm-up iterations included in
+    the driver wall time
+    """
+    results = [r for r in res['results'] if r is not None and 'iter_ms' in r]
+    if not results:
+        return None
+    ops = sum(r['ops'] * len(r['iter_ms']) for r in results)
+    span = max(r['end_time'] for r in results) - min(r['start_time'] for r in results)
+    return ops / span
+
+
+def print_iteration_report(report, unit='FLOP'):
+    if report is None:
+        return
+    rate = 'GFLOPS' if unit == 'FLOP' else 'G{}/s'.format(unit)
+    print('Iterations: {} timed after {} warm-up per function'.format(report['iterations'], report['warmup']))
+    print('Median iteration {}: {}'.format(rate, round(report['median_rate'] / 1e9, 4)))
+    print('Iteration rate CV within functions: {:.3f}, between functions: {:.3f}'.format(report['within_cv'],
+                                                                                       report['between_cv']))
+    print('Throttled functions: {} of {} ({:.1%}), median rate drop {:.1%}'.format(
+        report['throttled_functions'], report['functions'], report['throttled_fraction'], report['median_drop']))
+    if report['throttled_at_p50'] is not None:
+        print('Median time to throttling: {} sec'.format(round(report['throttled_at_p50'], 3)))
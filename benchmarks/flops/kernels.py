@@ -0,0 +1,147 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import math
+import time
+import numpy as np
+
+KERNELS = ['gemm_f64', 'gemm_f32', 'gemm_c64', 'fft', 'spmv', 'transcendental', 'sort']
+
+# Unit of the operations counted by the op model of every kernel
+OP_UNITS = {'gemm_f64': 'FLOP', 'gemm_f32': 'FLOP', 'gemm_c64': 'FLOP', 'fft': 'FLOP', 'spmv': 'FLOP',
+            'transcendental': 'eval', 'sort': 'compare'}
+
+GEMM_DTYPES = {'gemm_f64': np.float64, 'gemm_f32': np.float32, 'gemm_c64': np.complex64}
+SPMV_NNZ_PER_ROW = 16
+
+
+def problem_size(kernel, matn):
+    """
+    Returns the problem size of a kernel: the matrix size for GEMM, and
+    for the other kernels the number of elements (rows for SpMV) whose
+    working set matches the one of a float64 GEMM of size matn
+    """
+    if kernel in GEMM_DTYPES:
+        return matn
+    working_set = 3 * matn ** 2 * 8
+    if kernel == 'fft':
+        # complex128 input and output, power of two length
+        return 2 ** int(math.log2(working_set // 32))
+    if kernel == 'spmv':
+        # CSR float64 values and int32 indexes, plus the x and y vectors
+        return working_set // (SPMV_NNZ_PER_ROW * 12 + 16)
+    if kernel in ['transcendental', 'sort']:
+        # float64 input and output
+        return working_set // 16
+    raise ValueError('Unknown kernel {}, choose one of {}'.format(kernel, KERNELS))
+
+
+def op_model(kernel, n):
+    """
+    Returns the operations and the minimum bytes moved from memory by one
+    iteration of a kernel of problem size n
+    """
+    if kernel in ['gemm_f64', 'gemm_f32']:
+        return 2 * n ** 3, 3 * n ** 2 * np.dtype(GEMM_DTYPES[kernel]).itemsize
+    if kernel == 'gemm_c64':
+        # a complex multiply-add is 4 multiplications and 4 additions
+        return 8 * n ** 3, 3 * n ** 2 * np.dtype(np.complex64).itemsize
+    if kernel == 'fft':
+        # conventional 5 n log2(n) count of radix-2 FFTs
+        return 5 * n * int(math.log2(n)), 2 * n * 16
+    if kernel == 'spmv':
+        nnz = n * SPMV_NNZ_PER_ROW
+        # values, column indexes and gathered x elements, plus row pointers and y
+        return 2 * nnz, nnz * (8 + 4 + 8) + (n + 1) * 8 + n * 8
+    if kernel == 'transcendental':
+        # a sin and an exp per element
+        return 2 * n, 2 * n * 8
+    if kernel == 'sort':
+        return int(n * math.log2(n)), 2 * n * 8
+    raise ValueError('Unknown kernel {}, choose one of {}'.format(kernel, KERNELS))
+
+
+def setup_kernel(kernel, n):
+    """
+    Allocates the inputs of a kernel and returns the function running
+    one iteration of it
+    """
+    rng = np.random.default_rng(0)
+    if kernel in GEMM_DTYPES:
+        A = np.arange(n**2, dtype=np.float64).reshape(n, n)
+        B = np.arange(n**2, dtype=np.float64).reshape(n, n)
+        if kernel == 'gemm_c64':
+            A, B = A * (1 + 1j), B * (1 - 1j)
+        A, B = A.astype(GEMM_DTYPES[kernel]), B.astype(GEMM_DTYPES[kernel])
+        return lambda: np.sum(np.dot(A, B))
+    if kernel == 'fft':
+        x = rng.standard_normal(n) + 1j * rng.standard_normal(n)
+        return lambda: np.fft.fft(x)
+    if kernel == 'spmv':
+        nnz = n * SPMV_NNZ_PER_ROW
+        data = rng.random(nnz)
+        indices = rng.integers(0, n, nnz).astype(np.int32)
+        indptr = np.arange(0, nnz, SPMV_NNZ_PER_ROW)
+        x = rng.random(n)
+        return lambda: np.add.reduceat(data * x[indices], indptr)
+    if kernel == 'transcendental':
+        x = np.linspace(0.1, 10, n)
+        y = np.empty_like(x)
+
+        def run():
+            np.sin(x, out=y)
+            np.exp(y, out=y)
+        return run
+    if kernel == 'sort':
+        x = rng.random(n)
+        return lambda: np.sort(x)
+    raise ValueError('Unknown kernel {}, choose one of {}'.format(kernel, KERNELS))
+
+
+def compute_kernel(kernel, loopcount, matn, warmup=1):
+    """
+    Runs warmup unmeasured iterations of a kernel, then loopcount timed
+    ones, and returns its operation rate, in the 'flops' field for all
+    kernels, and its memory bandwidth. The duration of every timed
+    iteration is returned in 'iter_ms', rounded to microseconds, and
+    the timed window in 'start_time' and 'end_time'.
+    """
+    n = problem_size(kernel, matn)
+    ops, nbytes = op_model(kernel, n)
+    run = setup_kernel(kernel, n)
+
+    for i in range(warmup):
+        run()
+
+    iter_times = np.empty(loopcount)
+    start_time = time.time()
+    for i in range(loopcount):
+        t0 = time.perf_counter()
+        run()
+        iter_times[i] = time.perf_counter() - t0
+    end_time = time.time()
+    elapsed = iter_times.sum()
+
+    return {'kernel': kernel, 'flops': ops * loopcount / elapsed, 'gbs': nbytes * loopcount / elapsed / 1e9,
+            'ops': ops, 'warmup': warmup, 'start_time': start_time, 'end_time': end_time,
+            'iter_ms': np.round(iter_times * 1000, 3).tolist()}
+
+
+def estimated_ops(kernel, tasks, loopcount, matn):
+    """
+    Operations done by tasks functions running a kernel
+    """
+    return tasks * op_model(kernel, problem_size(kernel, matn))[0] * loopcount
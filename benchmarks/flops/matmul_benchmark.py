@@ -0,0 +1,283 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import io
+import os
+import sys
+import click
+import time
+import numpy as np
+import pandas as pd
+
+from lithops import FunctionExecutor, Storage
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.results_log import ResultLog, wait_and_log, load_run, TIMELINE_STATS
+from common.pricing import executor_cost, print_cost
+from common.plots import create_execution_histogram
+from plots import create_matmul_breakdown_plot
+
+PHASES = ['multiply', 'reduce']
+
+
+def block_key(prefix, matrix, i, j, k=None):
+    key = '{}/{}/{}_{}'.format(prefix, matrix, i, j)
+    return key if k is None else '{}_{}'.format(key, k)
+
+
+def random_block(seed, matrix, i, j, block):
+    """
+    Block (i, j) of matrix A or B, generated deterministically from the
+    seed of the run so the driver can regenerate it to verify the result
+    """
+    rng = np.random.default_rng([seed, ord(matrix), i, j])
+    return rng.random((block, block))
+
+
+def put_block(storage, bucket_name, key, x):
+    buf = io.BytesIO()
+    np.save(buf, x, allow_pickle=False)
+    data = buf.getvalue()
+    storage.put_object(bucket_name, key, data)
+    return len(data)
+
+
+def get_block(storage, bucket_name, key):
+    data = storage.get_object(bucket_name, key)
+    return np.load(io.BytesIO(data), allow_pickle=False), len(data)
+
+
+class PhaseTimer(object):
+    """
+    Splits the time of a worker into get, compute and put time, and
+    counts the bytes it read and wrote
+    """
+
+    def __init__(self, storage, bucket_name):
+        self.storage = storage
+        self.bucket_name = bucket_name
+        self.times = {'get_time': 0.0, 'compute_time': 0.0, 'put_time': 0.0}
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.gets = 0
+        self.puts = 0
+        self.start_time = time.time()
+
+    def get(self, key):
+        t0 = time.perf_counter()
+        x, nbytes = get_block(self.storage, self.bucket_name, key)
+        self.times['get_time'] += time.perf_counter() - t0
+        self.bytes_read += nbytes
+        self.gets += 1
+        return x
+
+    def put(self, key, x):
+        t0 = time.perf_counter()
+        self.bytes_written += put_block(self.storage, self.bucket_name, key, x)
+        self.times['put_time'] += time.perf_counter() - t0
+        self.puts += 1
+
+    def compute(self, func, *args):
+        t0 = time.perf_counter()
+        res = func(*args)
+        self.times['compute_time'] += time.perf_counter() - t0
+        return res
+
+    def result(self, **fields):
+        fields.update(self.times)
+        fields.update({'start_time': self.start_time, 'end_time': time.time(),
+                       'bytes_read': self.bytes_read, 'bytes_written': self.bytes_written,
+                       'gets': self.gets, 'puts': self.puts})
+        return fields
+
+
+def tiles(nblocks, k_per_task):
+    """
+    Map tasks of the multiply phase: every task multiplies k_per_task
+    consecutive pairs of blocks of a block row of A and a block column of B
+    """
+    return [(i, j, k) for i in range(nblocks) for j in range(nblocks) for k in range(0, nblocks, k_per_task)]
+
+
+def benchmark(backend, storage, bucket_name, matn, block, k_per_task, memory, key_prefix, seed, results_path, debug):
+    """
+    Computes C = A·B, with A and B matn x matn float64 matrices tiled into
+    block x block objects. A map over the (i, j, k) block tiles stores the
+    partial products, which a map over the (i, j) blocks of C reduces.
+    """
+    nblocks = matn // block
+    k_tasks = len(range(0, nblocks, k_per_task))
+
+    def generate_blocks(i, j, storage):
+        timer = PhaseTimer(storage, bucket_name)
+        for matrix in ['A', 'B']:
+            x = timer.compute(random_block, seed, matrix, i, j, block)
+            timer.put(block_key(key_prefix, matrix, i, j), x)
+        return timer.result(phase='generate', block=[i, j])
+
+    def multiply_tile(i, j, k, storage):
+        timer = PhaseTimer(storage, bucket_name)
+        partial = np.zeros((block, block))
+        for kk in range(k, min(k + k_per_task, nblocks)):
+            a = timer.get(block_key(key_prefix, 'A', i, kk))
+            b = timer.get(block_key(key_prefix, 'B', kk, j))
+            partial += timer.compute(np.dot, a, b)
+        timer.put(block_key(key_prefix, 'P', i, j, k), partial)
+        n_products = min(k + k_per_task, nblocks) - k
+        return timer.result(phase='multiply', block=[i, j, k], flops=2 * block ** 3 * n_products)
+
+    def reduce_block(i, j, storage):
+        timer = PhaseTimer(storage, bucket_name)
+        c = np.zeros((block, block))
+        for k in range(0, nblocks, k_per_task):
+            p = timer.get(block_key(key_prefix, 'P', i, j, k))
+            c = timer.compute(np.add, c, p)
+        timer.put(block_key(key_prefix, 'C', i, j), c)
+        return timer.result(phase='reduce', block=[i, j], flops=block ** 2 * (k_tasks - 1))
+
+    log_level = 'INFO' if not debug else 'DEBUG'
+    fexec = FunctionExecutor(backend=backend, storage=storage, runtime_memory=memory, log_level=log_level)
+    blocks = [(i, j) for i in range(nblocks) for j in range(nblocks)]
+
+    t0 = time.time()
+    fexec.get_result(fexec.map(generate_blocks, blocks))
+    print('Generated A and B in {} sec'.format(round(time.time() - t0, 3)))
+
+    start_time = time.time()
+    log = ResultLog(results_path, start_time=start_time, bucket_name=bucket_name, key_prefix=key_prefix,
+                    MATN=matn, block=block, k_per_task=k_per_task, seed=seed, memory=memory)
+    futures = fexec.map(multiply_tile, tiles(nblocks, k_per_task))
+    wait_and_log(fexec, futures, log)
+    reduce_start = time.time()
+    reduce_futures = fexec.map(reduce_block, blocks)
+    wait_and_log(fexec, reduce_futures, log)
+    end_time = time.time()
+    total_time = end_time - start_time
+    futures.extend(reduce_futures)
+
+    results = [f.result(throw_except=False) for f in futures if not f.error]
+    results = [r for r in results if r is not None]
+    bytes_read = sum(r['bytes_read'] for r in results)
+    bytes_written = sum(r['bytes_written'] for r in results)
+    gflop = 2 * matn ** 3 / 1e9
+    cost = executor_cost(fexec, futures, memory, puts=sum(r['puts'] for r in results),
+                         gets=sum(r['gets'] for r in results), gflop=gflop, gb=(bytes_read + bytes_written) / 1e9)
+    print_cost(cost)
+    log.close(total_time=total_time, multiply_time=reduce_start - start_time, reduce_time=end_time - reduce_start,
+              gflops=gflop / total_time, bytes_read=bytes_read, bytes_written=bytes_written,
+              failed=len(futures) - len(results), cost=cost)
+
+    return load_run(results_path, stats_keys=TIMELINE_STATS)
+
+
+def worker_breakdown(res):
+    """
+    Per phase totals and per-worker medians of the get, compute and put
+    time, and the share of the time of the workers spent in compute
+    """
+    results = pd.DataFrame([r for r in res['results'] if r is not None])
+    results['io_time'] = results.get_time + results.put_time
+    results['compute_share'] = results.compute_time / (results.compute_time + results.io_time)
+    rows = []
+    for phase in PHASES:
+        group = results[results.phase == phase]
+        if group.empty:
+            continue
+        rows.append({'phase': phase,
+                     'workers': len(group),
+                     'get_time': group.get_time.sum(),
+                     'compute_time': group.compute_time.sum(),
+                     'put_time': group.put_time.sum(),
+                     'worker_compute_p50': group.compute_time.median(),
+                     'worker_io_p50': group.io_time.median(),
+                     'compute_share_p50': group.compute_share.median(),
+                     'gb_moved': (group.bytes_read.sum() + group.bytes_written.sum()) / 1e9,
+                     'worker_gflops_p50': (group.flops / group.compute_time).median() / 1e9})
+    return pd.DataFrame(rows)
+
+
+def print_report(res):
+    print('Total time: {} sec (multiply {} sec, reduce {} sec)'.format(
+        round(res['total_time'], 3), round(res['multiply_time'], 3), round(res['reduce_time'], 3)))
+    print('End-to-end GFLOPS: {}'.format(round(res['gflops'], 4)))
+    print('Bytes moved: {} GB read, {} GB written'.format(round(res['bytes_read'] / 1e9, 3),
+                                                          round(res['bytes_written'] / 1e9, 3)))
+    print(worker_breakdown(res).round(3).to_string(index=False))
+
+
+def verify_block(storage, res, i=0, j=0):
+    """
+    Recomputes block (i, j) of C locally from the regenerated blocks of A and B,
+    and compares it to the one stored by the reduce phase
+    """
+    nblocks = res['MATN'] // res['block']
+    expected = sum(np.dot(random_block(res['seed'], 'A', i, k, res['block']),
+                          random_block(res['seed'], 'B', k, j, res['block'])) for k in range(nblocks))
+    c, _ = get_block(storage, res['bucket_name'], block_key(res['key_prefix'], 'C', i, j))
+    return np.allclose(c, expected)
+
+
+def delete_blocks(storage, res):
+    nblocks = res['MATN'] // res['block']
+    k_starts = range(0, nblocks, res['k_per_task'])
+    keys = [block_key(res['key_prefix'], m, i, j) for m in ['A', 'B', 'C']
+            for i in range(nblocks) for j in range(nblocks)]
+    keys += [block_key(res['key_prefix'], 'P', i, j, k) for i in range(nblocks) for j in range(nblocks) for k in k_starts]
+    storage.delete_objects(res['bucket_name'], keys)
+    return len(keys)
+
+
+def create_plots(res, outdir, name):
+    create_execution_histogram(res, "{}/{}_execution.png".format(outdir, name))
+    create_matmul_breakdown_plot(worker_breakdown(res), "{}/{}_breakdown.png".format(outdir, name))
+
+
+@click.command()
+@click.option('--backend', '-b', default=None, help='compute backend name', type=str)
+@click.option('--storage', '-s', default=None, help='storage backend name', type=str)
+@click.option('--bucket_name', default=None, help='bucket to save the blocks in, defaults to the storage bucket of lithops')
+@click.option('--key_prefix', default='matmul', help='Object key prefix of the blocks')
+@click.option('--matn', default=8192, help='size of the matrices', type=int)
+@click.option('--block', default=2048, help='size of the blocks the matrices are tiled into', type=int)
+@click.option('--k_per_task', default=1, help='pairs of blocks multiplied and summed by every multiply task', type=int)
+@click.option('--memory', default=2048, help='Memory per worker in MB', type=int)
+@click.option('--seed', default=0, help='seed of the random matrices', type=int)
+@click.option('--outdir', default='.', help='dir to save results in')
+@click.option('--name', help='filename to save results in')
+@click.option('--verify/--no-verify', default=True, help='check a block of C against a local computation')
+@click.option('--keep', is_flag=True, help='keep the blocks in storage after the run')
+@click.option('--debug', '-d', is_flag=True, help='debug mode')
+def run_benchmark(backend, storage, bucket_name, key_prefix, matn, block, k_per_task, memory, seed, outdir, name,
+                  verify, keep, debug):
+    if matn % block:
+        raise click.BadParameter('--matn must be a multiple of --block')
+    name = '{}_{}_matmul'.format(matn, block) if name is None else name
+    storage_client = Storage(backend=storage)
+    bucket_name = storage_client.bucket if bucket_name is None else bucket_name
+
+    res = benchmark(backend, storage, bucket_name, matn, block, k_per_task, memory, key_prefix, seed,
+                    f'{outdir}/{name}.jsonl', debug)
+    print_report(res)
+    if verify:
+        print('Block C[0, 0] verified:', verify_block(storage_client, res))
+    if not keep:
+        print('Deleted {} objects'.format(delete_blocks(storage_client, res)))
+    create_plots(res, outdir, name)
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -15,95 +15,34 @@
 #
 
 import os
+import sys
 import pylab
 import logging
 import numpy as np
 import pandas as pd
 import seaborn as sns
-from matplotlib.collections import LineCollection
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.timeline import spread_timeline
 
 pylab.switch_backend("Agg")
 logger = logging.getLogger(__name__)
 
 
-def create_execution_histogram(benchmark_data, dst):
-    start_time = benchmark_data['start_time']
-    time_rates = [(f['worker_start_tstamp'], f['worker_end_tstamp']) for f in benchmark_data['worker_stats']]
-    total_calls = len(time_rates)
-
-    max_seconds = int(max([tr[1]-start_time for tr in time_rates])*1.1)
-    max_seconds = 8 * round(max_seconds/8)
-
-    runtime_bins = np.linspace(0, max_seconds, max_seconds)
-
-    def compute_times_rates(time_rates):
-        x = np.array(time_rates)
-        tzero = start_time
-        tr_start_time = x[:, 0] - tzero
-        tr_end_time = x[:, 1] - tzero
-
-        N = len(tr_start_time)
-
-        runtime_calls_hist = np.zeros((N, len(runtime_bins)))
-
-        for i in range(N):
-            s = tr_start_time[i]
-            e = tr_end_time[i]
-            a, b = np.searchsorted(runtime_bins, [s, e])
-            if b-a > 0:
-                runtime_calls_hist[i, a:b] = 1
-
-        return {'start_time': tr_start_time,
-                'end_time': tr_end_time,
-                'runtime_calls_hist': runtime_calls_hist}
-
-    fig = pylab.figure(figsize=(5, 5))
-    ax = fig.add_subplot(1, 1, 1)
-
-    time_hist = compute_times_rates(time_rates)
-
-    N = len(time_hist['start_time'])
-    line_segments = LineCollection([[[time_hist['start_time'][i], i],
-                                     [time_hist['end_time'][i], i]] for i in range(N)],
-                                   linestyles='solid', color='k', alpha=0.6, linewidth=0.4)
-
-    ax.add_collection(line_segments)
-
-    ax.plot(runtime_bins, time_hist['runtime_calls_hist'].sum(axis=0), label='Parallel Functions', zorder=-1)
+def rate_label(unit):
+    return 'GFLOPS' if unit == 'FLOP' else 'G{}/s'.format(unit)
 
-    yplot_step = int(np.max([1, total_calls/20]))
-    y_ticks = np.arange(total_calls//yplot_step + 2) * yplot_step
-    ax.set_yticks(y_ticks)
-    ax.set_ylim(-0.02*total_calls, total_calls*1.02)
 
-    xplot_step = max(int(max_seconds/8), 1)
-    x_ticks = np.arange(int(max_seconds//xplot_step)+1) * xplot_step
-    ax.set_xlim(0, max_seconds)
-    ax.set_xticks(x_ticks)
-    for x in x_ticks:
-        ax.axvline(x, c='k', alpha=0.2, linewidth=0.8)
-
-    ax.set_xlabel("Execution Time (sec)")
-    ax.set_ylabel("Function Call")
-    ax.grid(False)
-    ax.legend(loc='upper right')
-
-    fig.tight_layout()
-
-    dst = os.path.expanduser(dst) if '~' in dst else dst
-
-    fig.savefig(dst)
-    pylab.close(fig)
-
-
-def create_rates_histogram(benchmark_data, dst):
+def create_rates_histogram(benchmark_data, dst, unit='FLOP'):
     results_df = pd.DataFrame(benchmark_data['results'])
     flops = results_df.flops/1e9
 
     fig = pylab.figure(figsize=(5, 5))
     ax = fig.add_subplot(1, 1, 1)
-    ax.hist(flops, bins=np.arange(0, flops.max()*1.2), histtype='bar', ec='black')
-    ax.set_xlabel('GFLOPS')
+    # power of ten bin width giving 10 to 100 bins, 1 GFLOPS for tens of GFLOPS
+    bin_width = 10 ** np.floor(np.log10(flops.max()*1.2 / 10))
+    ax.hist(flops, bins=np.arange(0, flops.max()*1.2 + bin_width, bin_width), histtype='bar', ec='black')
+    ax.set_xlabel(rate_label(unit))
     ax.set_ylabel('Total functions')
     ax.yaxis.grid(True)
     """
@@ -121,35 +60,29 @@ def create_rates_histogram(benchmark_data, dst):
     fig.savefig(dst)
 
 
-def create_total_gflops_plot(benchmark_data, dst):
+def create_total_gflops_plot(benchmark_data, dst, unit='FLOP'):
     tzero = benchmark_data['start_time']
-    data_df = pd.DataFrame(benchmark_data['worker_stats'])
-    data_df['est_flops'] = benchmark_data['est_flops'] / benchmark_data['workers']
+    worker_stats = benchmark_data['worker_stats']
+    est_flops = benchmark_data['est_flops'] / benchmark_data['workers']
 
-    max_time = np.max(data_df.worker_end_tstamp) - tzero
-    runtime_bins = np.linspace(0, int(max_time), int(max_time), endpoint=False)
-    runtime_flops_hist = np.zeros((len(data_df), len(runtime_bins)))
+    func_start = np.array([f['worker_func_start_tstamp'] for f in worker_stats]) - tzero
+    func_end = np.array([f['worker_func_end_tstamp'] for f in worker_stats]) - tzero
+    end_times = np.sort(np.array([f['worker_end_tstamp'] for f in worker_stats]) - tzero)
 
-    for i in range(len(data_df)):
-        row = data_df.iloc[i]
-        s = row.worker_func_start_tstamp - tzero
-        e = row.worker_func_end_tstamp - tzero
-        a, b = np.searchsorted(runtime_bins, [s, e])
-        if b-a > 0:
-            runtime_flops_hist[i, a:b] = row.est_flops / float(b-a)
+    max_time = np.max(end_times)
+    runtime_bins = np.linspace(0, int(max_time), int(max_time), endpoint=False)
+    runtime_flops = spread_timeline(runtime_bins, func_start, func_end, est_flops)
 
-    results_by_endtime = data_df.sort_values('worker_end_tstamp')
-    results_by_endtime['job_endtime_zeroed'] = data_df.worker_end_tstamp - tzero
-    results_by_endtime['flops_done'] = results_by_endtime.est_flops.cumsum()
-    results_by_endtime['rolling_flops_rate'] = results_by_endtime.flops_done/results_by_endtime.job_endtime_zeroed
+    flops_done = np.cumsum(np.full(len(end_times), est_flops))
+    rolling_flops_rate = flops_done / end_times
 
     fig = pylab.figure(figsize=(5, 5))
     ax = fig.add_subplot(1, 1, 1)
 
-    ax.plot(runtime_flops_hist.sum(axis=0)/1e9, label='Peak GFLOPS')
-    ax.plot(results_by_endtime.job_endtime_zeroed, results_by_endtime.rolling_flops_rate/1e9, label='Effective GFLOPS')
+    ax.plot(runtime_flops/1e9, label='Peak {}'.format(rate_label(unit)))
+    ax.plot(end_times, rolling_flops_rate/1e9, label='Effective {}'.format(rate_label(unit)))
     ax.set_xlabel('Execution Time (sec)')
-    ax.set_ylabel("GFLOPS")
+    ax.set_ylabel(rate_label(unit))
     ax.set_xlim(-1)
     ax.set_ylim(-1)
     pylab.legend(loc='upper right')
@@ -159,3 +92,74 @@ def create_total_gflops_plot(benchmark_data, dst):
 
     fig.tight_layout()
     fig.savefig(dst)
+
+
+def create_scaling_plot(summary, dst):
+    fig, (ax1, ax2) = pylab.subplots(nrows=1, ncols=2, figsize=(10, 5))
+    for (memory, mode), group in summary.groupby(['memory', 'mode']):
+        linestyle = 'solid' if mode == 'threads' else 'dashed'
+        label = '{} MB - {}'.format(memory, 'BLAS threads' if mode == 'threads' else 'processes')
+        ax1.plot(group.cores, group.gflops, marker='o', linestyle=linestyle, label=label)
+        ax2.plot(group.cores, group.efficiency, marker='o', linestyle=linestyle, label=label)
+
+    ax1.set_xlabel('Cores')
+    ax1.set_ylabel('GFLOPS')
+    ax1.set_ylim(0, )
+    ax1.grid(True)
+    ax2.set_xlabel('Cores')
+    ax2.set_ylabel('Parallel efficiency')
+    ax2.set_ylim(0, 1.1)
+    ax2.grid(True)
+    ax2.legend(loc='lower left', fontsize='small')
+
+    dst = os.path.expanduser(dst) if '~' in dst else dst
+
+    fig.tight_layout()
+    fig.savefig(dst)
+    pylab.close(fig)
+
+
+def create_iterations_plot(benchmark_data, dst, unit='FLOP'):
+    results = [r for r in benchmark_data['results'] if r is not None and 'iter_ms' in r]
+    iterations = min(len(r['iter_ms']) for r in results)
+    iter_times = np.array([r['iter_ms'][:iterations] for r in results]) / 1000
+    rates = np.array([r['ops'] for r in results])[:, None] / iter_times / 1e9
+    ends = np.median(np.cumsum(iter_times, axis=1), axis=0)
+
+    fig = pylab.figure(figsize=(5, 5))
+    ax = fig.add_subplot(1, 1, 1)
+    ax.fill_between(ends, np.percentile(rates, 10, axis=0), np.percentile(rates, 90, axis=0), alpha=0.3,
+                    label='p10-p90')
+    ax.plot(ends, np.median(rates, axis=0), marker='.', label='Median')
+    ax.set_xlabel('Time since the first timed iteration (sec)')
+    ax.set_ylabel('{} per iteration'.format(rate_label(unit)))
+    ax.set_xlim(0, )
+    ax.set_ylim(0, )
+    pylab.legend(loc='lower left')
+    pylab.grid(True, axis='y')
+
+    dst = os.path.expanduser(dst) if '~' in dst else dst
+
+    fig.tight_layout()
+    fig.savefig(dst)
+    pylab.close(fig)
+
+
+def create_matmul_breakdown_plot(breakdown, dst):
+    fig = pylab.figure(figsize=(5, 3))
+    ax = fig.add_subplot(1, 1, 1)
+    left = np.zeros(len(breakdown))
+    for column, label in [('get_time', 'GET'), ('compute_time', 'Compute'), ('put_time', 'PUT')]:
+        ax.barh(breakdown.phase, breakdown[column], left=left, label=label, edgecolor='k')
+        left += breakdown[column].values
+
+    ax.set_xlabel('Total worker time (sec)')
+    ax.invert_yaxis()
+    pylab.legend(loc='lower right')
+    pylab.grid(True, axis='x')
+
+    dst = os.path.expanduser(dst) if '~' in dst else dst
+
+    fig.tight_layout()
+    fig.savefig(dst)
+    pylab.close(fig)
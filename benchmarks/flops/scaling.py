@@ -0,0 +1,143 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import os
+import time
+import numpy as np
+import pandas as pd
+import multiprocessing as mp
+
+from kernels import problem_size, op_model, setup_kernel
+
+BLAS_THREADS_ENV = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'BLIS_NUM_THREADS',
+                    'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS']
+
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count()
+
+
+def core_counts(cores):
+    """
+    Powers of two up to the number of cores, plus the number of cores
+    """
+    counts = []
+    n = 1
+    while n < cores:
+        counts.append(n)
+        n *= 2
+    return counts + [cores]
+
+
+def _gemm_process(conn, kernel, loopcount, matn):
+    n = problem_size(kernel, matn)
+    ops = op_model(kernel, n)[0] * loopcount
+    run = setup_kernel(kernel, n)
+    start = time.time()
+    for i in range(loopcount):
+        run()
+    end = time.time()
+    conn.send((ops, start, end))
+    conn.close()
+
+
+def run_pinned(threads, processes, kernel, loopcount, matn):
+    """
+    Runs the kernel in processes child processes, each one with its BLAS
+    thread pool limited to threads, and returns their aggregate FLOPS.
+    The children are spawned, so the thread limits are set before numpy is
+    loaded, and report back through pipes, as functions such as AWS Lambda
+    do not support the shared memory multiprocessing queues need.
+    """
+    ctx = mp.get_context('spawn')
+    saved_env = {k: os.environ.get(k) for k in BLAS_THREADS_ENV}
+    os.environ.update({k: str(threads) for k in BLAS_THREADS_ENV})
+    try:
+        workers = []
+        for i in range(processes):
+            parent_conn, child_conn = ctx.Pipe(duplex=False)
+            p = ctx.Process(target=_gemm_process, args=(child_conn, kernel, loopcount, matn))
+            p.start()
+            workers.append((p, parent_conn))
+        results = []
+        for p, conn in workers:
+            results.append(conn.recv())
+            p.join()
+    finally:
+        for k, v in saved_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+    ops = sum(r[0] for r in results)
+    span = max(r[2] for r in results) - min(r[1] for r in results)
+    return ops / span
+
+
+def core_scaling(loopcount, matn, kernel='gemm_f64'):
+    """
+    Measures the FLOPS of a kernel with the BLAS thread pool pinned to
+    1 to all the available cores, and with 1 to all the cores single-threaded
+    processes, and returns the FLOPS per core and the parallel efficiency
+    of every configuration, relative to a single thread
+    """
+    cores = available_cores()
+    res = {'cores': cores, 'kernel': kernel, 'start_time': time.time()}
+    base = None
+    for mode in ['threads', 'processes']:
+        res[mode] = []
+        for n in core_counts(cores):
+            if mode == 'threads':
+                flops = run_pinned(n, 1, kernel, loopcount, matn)
+            else:
+                flops = run_pinned(1, n, kernel, loopcount, matn)
+            if base is None:
+                base = flops
+            res[mode].append({'cores': n, 'flops': flops, 'flops_per_core': flops / n,
+                              'efficiency': flops / (n * base)})
+    res['end_time'] = time.time()
+    res['flops'] = max(r['flops'] for mode in ['threads', 'processes'] for r in res[mode])
+    return res
+
+
+def scaling_summary(runs):
+    """
+    Summarizes the core scaling runs of several memory sizes, given as a
+    dict of memory size to run, into the median GFLOPS, GFLOPS per core and
+    parallel efficiency of every mode and number of cores
+    """
+    rows = []
+    for memory, res in sorted(runs.items()):
+        results = [r for r in res['results'] if r is not None]
+        for mode in ['threads', 'processes']:
+            points = pd.DataFrame([p for r in results for p in r[mode]])
+            if points.empty:
+                continue
+            for cores, group in points.groupby('cores'):
+                rows.append({'memory': memory,
+                             'available_cores': int(np.median([r['cores'] for r in results])),
+                             'mode': mode,
+                             'cores': cores,
+                             'workers': len(group),
+                             'gflops': group.flops.median() / 1e9,
+                             'gflops_per_core': group.flops_per_core.median() / 1e9,
+                             'efficiency': group.efficiency.median()})
+    return pd.DataFrame(rows)
@@ -0,0 +1,182 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import os
+import sys
+import click
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.results_log import ResultLog, wait_and_log, load_run, find_runs, TIMELINE_STATS
+from common.pricing import executor_cost, print_cost
+from plots import create_ramp_up_plot, create_launch_rate_plot
+
+RAMP_QUANTILES = np.linspace(0, 100, 101)
+
+
+def sleep_function(seconds):
+    """
+    No-op function when seconds is 0, otherwise sleeps, so functions
+    overlap and the time until all of them run together can be measured
+    """
+    start_time = time.time()
+    if seconds:
+        time.sleep(seconds)
+    return {'start_time': start_time, 'end_time': time.time()}
+
+
+def benchmark(backend, storage, workers, memory, sleep, results_path, debug):
+    # imported here so the compare command runs where lithops is not installed
+    from lithops import FunctionExecutor
+
+    log_level = 'INFO' if not debug else 'DEBUG'
+    fexec = FunctionExecutor(backend=backend, storage=storage, runtime_memory=memory, log_level=log_level)
+    start_time = time.time()
+    log = ResultLog(results_path, start_time=start_time, backend=fexec.backend, workers=workers, memory=memory,
+                    sleep=sleep)
+    worker_futures = fexec.map(sleep_function, [sleep] * workers)
+    invoke_time = time.time() - start_time
+    wait_and_log(fexec, worker_futures, log)
+    end_time = time.time()
+    total_time = end_time-start_time
+
+    print("Total time:", round(total_time, 3))
+    cost = executor_cost(fexec, worker_futures, memory)
+    print_cost(cost)
+    log.close(total_time=total_time, invoke_time=invoke_time, cost=cost)
+
+    return load_run(results_path, stats_keys=TIMELINE_STATS)
+
+
+def launch_metrics(res):
+    """
+    Launch throughput of a run, from the worker_start_tstamp of its
+    functions relative to the start of the run: starts per second, overall
+    and in the busiest second, time until the first, half, 90% and all the
+    functions started, peak number of functions running together, and the
+    ramp-up curve as the time at which every percent of the functions started
+    """
+    stats = [s for s in res['worker_stats'] if 'worker_start_tstamp' in s and 'worker_end_tstamp' in s]
+    starts = np.sort([s['worker_start_tstamp'] for s in stats]) - res['start_time']
+    ends = np.array([s['worker_end_tstamp'] for s in stats]) - res['start_time']
+    n = len(starts)
+    if n == 0:
+        return None
+
+    ramp_time = starts[-1] - starts[0]
+    # functions started in the second after every start
+    started_within_1s = np.searchsorted(starts, starts + 1.0) - np.arange(n)
+    events = np.concatenate([np.ones(n), -np.ones(n)])[np.argsort(np.concatenate([starts, ends]), kind='stable')]
+    submit_latency = [s['worker_start_tstamp'] - s['host_submit_tstamp'] for s in stats if 'host_submit_tstamp' in s]
+
+    return {'backend': res.get('backend'),
+            'workers': res.get('workers', n),
+            'functions': n,
+            'sleep': res.get('sleep'),
+            'invoke_time': res.get('invoke_time'),
+            'first_start': starts[0],
+            'p50_start': np.percentile(starts, 50),
+            'p90_start': np.percentile(starts, 90),
+            'time_to_all_running': starts[-1],
+            'launch_rate': (n - 1) / ramp_time if ramp_time > 0 else np.nan,
+            'peak_launch_rate': started_within_1s.max(),
+            'peak_running': int(np.cumsum(events).max()),
+            'submit_latency_p50': np.median(submit_latency) if submit_latency else np.nan,
+            'ramp_quantiles': np.percentile(starts, RAMP_QUANTILES).tolist()}
+
+
+def print_metrics(metrics):
+    print('Functions started: {} of {}'.format(metrics['functions'], metrics['workers']))
+    print('First, 50%, 90% and all functions started after {}, {}, {} and {} sec'.format(
+        *[round(metrics[k], 3) for k in ['first_start', 'p50_start', 'p90_start', 'time_to_all_running']]))
+    print('Launch rate: {} functions/sec, {} in the busiest second'.format(round(metrics['launch_rate'], 1),
+                                                                            metrics['peak_launch_rate']))
+    print('Peak running functions: {}'.format(metrics['peak_running']))
+
+
+def summary_table(runs):
+    """
+    Launch metrics of a list of (label, run) tuples, one row per run
+    """
+    rows = []
+    for label, res in runs:
+        metrics = launch_metrics(res)
+        if metrics is not None:
+            metrics['run'] = label
+            rows.append(metrics)
+    return pd.DataFrame(rows)
+
+
+SUMMARY_COLUMNS = ['run', 'backend', 'workers', 'functions', 'sleep', 'invoke_time', 'first_start', 'p50_start',
+                   'p90_start', 'time_to_all_running', 'launch_rate', 'peak_launch_rate', 'peak_running',
+                   'submit_latency_p50']
+
+
+def save_summary(summary, outdir, name):
+    print(summary.reindex(columns=SUMMARY_COLUMNS).to_string(index=False, float_format='{:.4g}'.format))
+    summary.reindex(columns=SUMMARY_COLUMNS).to_csv('{}/{}_summary.csv'.format(outdir, name), index=False)
+    create_ramp_up_plot(summary, '{}/{}_ramp_up.png'.format(outdir, name))
+    create_launch_rate_plot(summary, '{}/{}_launch_rate.png'.format(outdir, name))
+
+
+@click.group()
+def cli():
+    pass
+
+
+@cli.command('run')
+@click.option('--backend', '-b', default=None, help='compute backend name', type=str)
+@click.option('--storage', '-s', default=None, help='storage backend name', type=str)
+@click.option('--concurrency', default='10,100,1000,10000', help='comma-separated numbers of functions to start')
+@click.option('--sleep', default=0.0, help='seconds every function sleeps, 0 for no-op functions', type=float)
+@click.option('--memory', default=256, help='Memory per worker in MB', type=int)
+@click.option('--outdir', default='.', help='dir to save results in')
+@click.option('--name', default='invocation', help='filename prefix to save results in')
+@click.option('--debug', '-d', is_flag=True, help='debug mode')
+def run_command(backend, storage, concurrency, sleep, memory, outdir, name, debug):
+    """
+    Starts every number of no-op or sleeping functions of --concurrency
+    """
+    runs = []
+    for workers in [int(c) for c in concurrency.split(',')]:
+        print('Concurrency: {}'.format(workers))
+        run_name = '{}_{}'.format(name, workers)
+        res = benchmark(backend, storage, workers, memory, sleep, f'{outdir}/{run_name}.jsonl', debug)
+        metrics = launch_metrics(res)
+        if metrics is not None:
+            print_metrics(metrics)
+        runs.append((run_name, res))
+    save_summary(summary_table(runs), outdir, name)
+
+
+@cli.command('compare')
+@click.argument('paths', nargs=-1, required=True)
+@click.option('--outdir', default='.', help='dir to save the summary and plots in')
+@click.option('--name', default='invocation_compare', help='filename prefix to save results in')
+def compare_command(paths, outdir, name):
+    """
+    Compares the runs in PATHS (result logs or directories of them),
+    e.g. the runs of several backends
+    """
+    runs = [(label, load_run(path, stats_keys=TIMELINE_STATS)) for label, path in find_runs(paths)]
+    save_summary(summary_table(runs), outdir, name)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,67 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import os
+import pylab
+import numpy as np
+
+pylab.switch_backend("Agg")
+
+
+def create_ramp_up_plot(summary, dst):
+    fig = pylab.figure(figsize=(5, 5))
+    ax = fig.add_subplot(1, 1, 1)
+    linestyles = ['solid', 'dashed', 'dotted', 'dashdot']
+    for i, row in enumerate(summary.itertuples()):
+        fraction = np.linspace(0, 1, len(row.ramp_quantiles))
+        ax.plot(row.ramp_quantiles, fraction, linestyle=linestyles[i // 10 % len(linestyles)], label=row.run)
+
+    ax.set_xlabel('Time since the functions were invoked (sec)')
+    ax.set_ylabel('Fraction of functions started')
+    ax.set_xlim(0, )
+    ax.set_ylim(0, 1.02)
+    pylab.legend(loc='lower right', fontsize='small')
+    pylab.grid(True)
+
+    dst = os.path.expanduser(dst) if '~' in dst else dst
+
+    fig.tight_layout()
+    fig.savefig(dst)
+    pylab.close(fig)
+
+
+def create_launch_rate_plot(summary, dst):
+    fig, (ax1, ax2) = pylab.subplots(nrows=1, ncols=2, figsize=(10, 5))
+    for backend, group in summary.groupby(summary.backend.fillna('unknown')):
+        group = group.sort_values('workers')
+        ax1.plot(group.workers, group.launch_rate, marker='o', label=backend)
+        ax2.plot(group.workers, group.time_to_all_running, marker='o', label=backend)
+
+    for ax in [ax1, ax2]:
+        ax.set_xscale('log')
+        ax.set_xlabel('Functions invoked')
+        ax.set_ylim(0, )
+        ax.grid(True)
+    ax1.set_ylabel('Functions started per second')
+    ax2.set_ylabel('Time until all functions started (sec)')
+    ax1.legend(loc='upper left')
+
+    dst = os.path.expanduser(dst) if '~' in dst else dst
+
+    fig.tight_layout()
+    fig.savefig(dst)
+    pylab.close(fig)
@@ -0,0 +1,124 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import zlib
+import time
+import queue
+import hashlib
+import threading
+
+CHECKSUMS = ['none', 'md5', 'crc32', 'xxhash']
+
+
+class Crc32(object):
+    """
+    hashlib-like wrapper around zlib.crc32
+    """
+
+    def __init__(self):
+        self.value = 0
+
+    def update(self, data):
+        self.value = zlib.crc32(data, self.value)
+
+    def hexdigest(self):
+        return '{:08x}'.format(self.value)
+
+
+def new_checksum(name):
+    if name == 'none':
+        return None
+    if name == 'md5':
+        return hashlib.md5()
+    if name == 'crc32':
+        return Crc32()
+    if name == 'xxhash':
+        try:
+            import xxhash
+        except ImportError:
+            raise ValueError('The xxhash checksum requires the xxhash package in the runtime')
+        return xxhash.xxh3_64()
+    raise ValueError('Unknown checksum {}, choose one of {}'.format(name, CHECKSUMS))
+
+
+class ChecksumPipeline(object):
+    """
+    Computes a checksum in a background thread, fed with blocks
+    through a bounded queue, so hashing overlaps with network reads.
+
+    Keeps track of the time spent hashing, the time the reader was
+    blocked because the queue was full, and the time spent waiting
+    for the pending blocks to be hashed once reading finished.
+    """
+
+    def __init__(self, name, queue_size=4):
+        self.name = name
+        self.checksum = new_checksum(name)
+        self.hash_time = 0.0
+        self.put_wait_time = 0.0
+        self.drain_time = 0.0
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = None
+        self.error = None
+        if self.checksum is not None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            data = self.queue.get()
+            if data is None:
+                break
+            t0 = time.time()
+            try:
+                self.checksum.update(data)
+            except Exception as e:
+                self.error = e
+                raise
+            self.hash_time += time.time() - t0
+
+    def _put(self, item):
+        # give up instead of blocking forever if the hashing thread died
+        while True:
+            try:
+                self.queue.put(item, timeout=1)
+                return
+            except queue.Full:
+                if not self.thread.is_alive():
+                    raise RuntimeError('The {} checksum thread is no longer running'.format(self.name))
+
+    def update(self, data):
+        if self.checksum is None:
+            return
+        t0 = time.time()
+        self._put(data)
+        self.put_wait_time += time.time() - t0
+
+    def close(self):
+        if self.checksum is None:
+            return None
+        t0 = time.time()
+        self._put(None)
+        self.thread.join()
+        self.drain_time = time.time() - t0
+        if self.error is not None:
+            raise RuntimeError('The {} checksum failed: {}'.format(self.name, self.error))
+        return self.checksum.hexdigest()
+
+    def stats(self):
+        return {'checksum_type': self.name,
+                'hash_time': self.hash_time,
+                'hash_wait_time': self.put_wait_time + self.drain_time}
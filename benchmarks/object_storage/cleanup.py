@@ -0,0 +1,145 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from workloads import is_throttling_error
+
+DELETE_BATCH_SIZE = 1000
+RETRYABLE_CODES = ['SlowDown', 'Throttling', 'ThrottlingException', 'TooManyRequests',
+                   'RequestLimitExceeded', 'ServiceUnavailable', 'InternalError']
+
+
+def is_transient_error(e):
+    """
+    Whether a failed request is worth retrying: throttling, server-side
+    errors, and connection errors and timeouts. Permanent errors (e.g.
+    AccessDenied or NoSuchBucket) are not retried.
+    """
+    if is_throttling_error(e) or isinstance(e, (ConnectionError, TimeoutError)):
+        return True
+    msg = '{} {}'.format(type(e).__name__, e)
+    return any(marker in msg for marker in RETRYABLE_CODES + ['ConnectionError', 'Timeout'])
+
+
+def delete_batch(storage, bucket_name, keys, max_retries=5, backoff=0.5):
+    """
+    Deletes a batch of keys with a single request, retrying the keys
+    which were throttled with exponential backoff and jitter. On a
+    permanent error the batch fails right away.
+    With S3-compatible backends the per-key errors of the multi-object
+    delete response are taken into account.
+    """
+    client = storage.get_client()
+    multi_delete = hasattr(client, 'delete_objects')
+    pending = list(keys)
+    failed = 0
+    retries = 0
+
+    for attempt in range(max_retries + 1):
+        retry_keys = []
+        try:
+            if multi_delete:
+                resp = client.delete_objects(Bucket=bucket_name,
+                                             Delete={'Objects': [{'Key': k} for k in pending], 'Quiet': True})
+                for error in resp.get('Errors', []):
+                    if error.get('Code') in RETRYABLE_CODES:
+                        retry_keys.append(error['Key'])
+                    else:
+                        failed += 1
+            else:
+                storage.delete_objects(bucket_name, pending)
+        except Exception as e:
+            if not is_transient_error(e):
+                print(e)
+                break
+            retry_keys = pending
+
+        if not retry_keys:
+            pending = []
+            break
+        pending = retry_keys
+        if attempt < max_retries:
+            retries += 1
+            time.sleep(backoff * 2 ** attempt * (1 + random.random()))
+
+    failed += len(pending)
+    return {'deleted': len(keys) - failed, 'failed': failed, 'retries': retries}
+
+
+def delete_objects_parallel(storage, bucket_name, keynames=None, prefix=None,
+                            batch_size=DELETE_BATCH_SIZE, threads=16, max_retries=5, backoff=0.5):
+    """
+    Deletes a list of keys, or all the keys under a prefix, splitting them
+    into batches of batch_size keys deleted concurrently by a pool of threads.
+    """
+    start_time = time.time()
+    if keynames is None:
+        keynames = storage.list_keys(bucket_name, prefix)
+    batches = [keynames[i:i + batch_size] for i in range(0, len(keynames), batch_size)]
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda batch: delete_batch(storage, bucket_name, batch, max_retries, backoff),
+                                batches))
+    end_time = time.time()
+
+    return summarize_deletes(results, start_time, end_time)
+
+
+def summarize_deletes(results, start_time, end_time):
+    deleted = sum(r['deleted'] for r in results)
+    total_time = end_time - start_time
+    return {'start_time': start_time,
+            'total_time': total_time,
+            'batches': len(results),
+            'deleted': deleted,
+            'failed': sum(r['failed'] for r in results),
+            'retries': sum(r['retries'] for r in results),
+            'objects_rate': deleted / total_time if total_time > 0 else 0.0}
+
+
+def delete_objects_map(fexec, bucket_name, keynames, batch_size=DELETE_BATCH_SIZE, batches_per_worker=10,
+                       threads=16, max_retries=5, backoff=0.5):
+    """
+    Deletes a list of keys by mapping groups of batches over functions,
+    each of them deleting its batches with a pool of threads.
+    """
+    def delete_keys(keys, storage):
+        return delete_objects_parallel(storage, bucket_name, keys, batch_size=batch_size, threads=threads,
+                                       max_retries=max_retries, backoff=backoff)
+
+    keys_per_worker = batch_size * batches_per_worker
+    iterable = [(keynames[i:i + keys_per_worker],) for i in range(0, len(keynames), keys_per_worker)]
+
+    start_time = time.time()
+    futures = fexec.map(delete_keys, iterable)
+    results = fexec.get_result(fs=futures, throw_except=False)
+    end_time = time.time()
+
+    results = [r for r in results if r is not None]
+    summary = summarize_deletes(results, start_time, end_time)
+    summary['batches'] = sum(r['batches'] for r in results)
+    summary['failed'] += len(keynames) - sum(r['deleted'] + r['failed'] for r in results)
+
+    return summary
+
+
+def print_delete_summary(summary):
+    print('Deleted: {} - Failed: {} - Retries: {} - Batches: {} - Time: {}s - Objects/s: {}'.format(
+        summary['deleted'], summary['failed'], summary['retries'], summary['batches'],
+        round(summary['total_time'], 3), round(summary['objects_rate'], 2)))
@@ -0,0 +1,83 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import math
+import numpy as np
+
+# Buckets cover 1us to 1000s with 20 log-spaced buckets per decade,
+# plus an underflow and an overflow bucket at both ends
+MIN_EXP = -6
+MAX_EXP = 3
+BUCKETS_PER_DECADE = 20
+N_BUCKETS = (MAX_EXP - MIN_EXP) * BUCKETS_PER_DECADE + 2
+BUCKET_EDGES = np.logspace(MIN_EXP, MAX_EXP, N_BUCKETS - 1)
+
+
+class LatencyHistogram(object):
+    """
+    Log-bucketed histogram of latencies in seconds. All histograms
+    share the same bucket edges, so histograms recorded by different
+    workers are merged by adding their counts.
+    """
+
+    def __init__(self, counts=None):
+        self.counts = np.zeros(N_BUCKETS, dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+
+    def record(self, seconds):
+        if seconds <= 0:
+            idx = 0
+        else:
+            idx = int(math.floor((math.log10(seconds) - MIN_EXP) * BUCKETS_PER_DECADE)) + 1
+            idx = min(max(idx, 0), N_BUCKETS - 1)
+        self.counts[idx] += 1
+
+    def record_many(self, seconds):
+        idx = np.searchsorted(BUCKET_EDGES, np.asarray(seconds), side='right')
+        self.counts += np.bincount(idx, minlength=N_BUCKETS)
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def cdf(self):
+        """
+        Returns the upper bucket edges and the cumulative fraction of
+        samples below each of them.
+        """
+        upper_edges = np.append(BUCKET_EDGES, np.inf)
+        total = max(self.total, 1)
+        return upper_edges, np.cumsum(self.counts) / total
+
+    def percentile(self, q):
+        if self.total == 0:
+            return None
+        upper_edges, cdf = self.cdf()
+        idx = int(np.searchsorted(cdf, q / 100.0))
+        return float(upper_edges[min(idx, N_BUCKETS - 2)])
+
+
+def merge_histograms(counts_list):
+    """
+    Merges a list of histogram counts arrays into a single LatencyHistogram
+    """
+    hist = LatencyHistogram()
+    for counts in counts_list:
+        hist.merge(LatencyHistogram(counts))
+    return hist
@@ -14,15 +14,29 @@
 # limitations under the License.
 #
 
+import os
+import sys
 import uuid
 import numpy as np
+import pandas as pd
 import time
-import hashlib
 import pickle
+import hashlib
 import click
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from lithops import FunctionExecutor, Storage
-from plots import create_execution_histogram, create_rates_histogram, create_agg_bdwth_plot
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.results_log import ResultLog, wait_and_log, load_run, TIMELINE_STATS
+from common.pricing import executor_cost, print_cost
+from checksums import CHECKSUMS, ChecksumPipeline
+from cleanup import DELETE_BATCH_SIZE, delete_objects_parallel, delete_objects_map, print_delete_summary
+from histograms import LatencyHistogram
+from workloads import DISTRIBUTIONS, OP_OK, OP_THROTTLED, OP_ERROR, build_schedule, is_throttling_error, ops_timeline
+from plots import create_execution_histogram, create_rates_histogram, create_agg_bdwth_plot, create_latency_cdf_plot, \
+    create_mixed_timeline_plot, create_sweep_plot
 
 
 class RandomDataGenerator(object):
@@ -33,26 +47,28 @@ class RandomDataGenerator(object):
     2. Actually generates random data to eliminate
     false metrics based on compression.
 
-    It does this by generating data in 1MB blocks
-    from np.random where each block is seeded with
-    the block number.
+    It does this by preallocating a 1MB random pattern and
+    writing every block as the pattern XORed with a 64-bit key
+    derived from the block number, straight into the buffer of
+    the caller for readinto(), so no two blocks share a run of
+    bytes and no data is concatenated per request.
     """
 
+    BLOCK_SIZE_BYTES = 1024*1024
+
     def __init__(self, bytes_total):
         self.bytes_total = bytes_total
         self.pos = 0
-        self.current_block_id = None
-        self.current_block_data = ""
-        self.BLOCK_SIZE_BYTES = 1024*1024
-        self.block_random = np.random.randint(0, 256, dtype=np.uint8,
-                                              size=self.BLOCK_SIZE_BYTES)
+        rng = np.random.default_rng()
+        self.pattern = rng.integers(0, 2**64, dtype=np.uint64, size=self.BLOCK_SIZE_BYTES // 8)
+        self.seed = int(rng.integers(0, 2**63))
 
     def __len__(self):
         return self.bytes_total
 
     @property
     def len(self):
-        return self.bytes_total 
+        return self.bytes_total
 
     def tell(self):
         return self.pos
@@ -64,118 +80,386 @@ class RandomDataGenerator(object):
             self.pos += pos
         elif whence == 2:
             self.pos = self.bytes_total - pos
+        return self.pos
+
+    def readable(self):
+        return True
 
-    def get_block(self, block_id):
-        if block_id == self.current_block_id:
-            return self.current_block_data
+    def seekable(self):
+        return True
 
-        self.current_block_id = block_id
-        self.current_block_data = (block_id + self.block_random).tostring()
-        return self.current_block_data
+    def block_key(self, block_id):
+        # splitmix64 of the block number, so keys differ in all their bytes
+        z = (self.seed + (block_id + 1) * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+        return np.uint64(z ^ (z >> 31))
 
     def get_block_coords(self, abs_pos):
         block_id = abs_pos // self.BLOCK_SIZE_BYTES
         within_block_pos = abs_pos - block_id * self.BLOCK_SIZE_BYTES
         return block_id, within_block_pos
 
-    def read(self, bytes_requested):
+    def fill(self, dst):
+        """
+        Writes the next len(dst) bytes, never crossing a block
+        boundary, into the writable buffer dst
+        """
+        block_id, within_block_pos = self.get_block_coords(self.pos)
+        start = within_block_pos - within_block_pos % 8
+        stop = -(-(within_block_pos + len(dst)) // 8) * 8
+        key = self.block_key(block_id)
+        out = np.frombuffer(dst, dtype=np.uint8)
+        if start == within_block_pos and stop == within_block_pos + len(dst):
+            np.bitwise_xor(self.pattern[start // 8:stop // 8], key, out=out.view(np.uint64))
+        else:
+            words = np.bitwise_xor(self.pattern[start // 8:stop // 8], key)
+            out[:] = words.view(np.uint8)[within_block_pos - start:within_block_pos - start + len(dst)]
+        self.pos += len(dst)
+
+    def read1(self, bytes_requested=-1):
+        """
+        Returns a new buffer with up to bytes_requested bytes,
+        never crossing a block boundary.
+        """
         remaining_bytes = self.bytes_total - self.pos
-        if remaining_bytes == 0:
-            return b''
-
-        bytes_out = min(remaining_bytes, bytes_requested)
-        start_pos = self.pos
-
-        byte_data = b''
+        if bytes_requested is None or bytes_requested < 0:
+            bytes_requested = remaining_bytes
+        if remaining_bytes <= 0 or bytes_requested == 0:
+            return memoryview(b'')
+
+        _, within_block_pos = self.get_block_coords(self.pos)
+        bytes_out = min(remaining_bytes, bytes_requested,
+                        self.BLOCK_SIZE_BYTES - within_block_pos)
+        chunk = memoryview(np.empty(bytes_out, dtype=np.uint8))
+        self.fill(chunk)
+        return chunk
+
+    def readinto(self, b):
+        dst = memoryview(b).cast('B')
+        bytes_out = max(0, min(self.bytes_total - self.pos, len(dst)))
         byte_pos = 0
         while byte_pos < bytes_out:
-            abs_pos = start_pos + byte_pos
-            bytes_remaining = bytes_out - byte_pos
+            _, within_block_pos = self.get_block_coords(self.pos)
+            n = min(bytes_out - byte_pos, self.BLOCK_SIZE_BYTES - within_block_pos)
+            self.fill(dst[byte_pos:byte_pos + n])
+            byte_pos += n
+        return byte_pos
+
+    def read(self, bytes_requested=-1):
+        """
+        Returns up to bytes_requested bytes, generated in place in a
+        single bytearray, which SDKs accept wherever they accept bytes
+        """
+        remaining_bytes = self.bytes_total - self.pos
+        if bytes_requested is None or bytes_requested < 0:
+            bytes_requested = remaining_bytes
+        data = bytearray(max(0, min(remaining_bytes, bytes_requested)))
+        self.readinto(data)
+        return data
 
-            block_id, within_block_pos = self.get_block_coords(abs_pos)
-            block = self.get_block(block_id)
-            # how many bytes can we copy?
-            chunk = block[within_block_pos:within_block_pos + bytes_remaining]
+    def __iter__(self):
+        chunk = self.read1(self.BLOCK_SIZE_BYTES)
+        while len(chunk) > 0:
+            yield chunk
+            chunk = self.read1(self.BLOCK_SIZE_BYTES)
 
-            byte_data += chunk
 
-            byte_pos += len(chunk)
+def datagen_benchmark(mb_sizes, total_mb):
+    """
+    Measures the local throughput of RandomDataGenerator for
+    different read sizes, using read(), readinto() and read1().
+    Every method generates the bytes it returns, and their sum is
+    computed so every byte is also read back.
+    """
+    results = []
+    for mb in mb_sizes:
+        read_size = mb * 1024**2
+        bytes_total = max(total_mb * 1024**2, read_size)
+        buf = bytearray(read_size)
+
+        for method in ['read', 'readinto', 'read1']:
+            d = RandomDataGenerator(bytes_total)
+            checksum = 0
+            start_time = time.time()
+            while True:
+                if method == 'read':
+                    chunk = d.read(read_size)
+                elif method == 'readinto':
+                    chunk = memoryview(buf)[:d.readinto(buf)]
+                else:
+                    chunk = d.read1(read_size)
+                if len(chunk) == 0:
+                    break
+                checksum += int(np.frombuffer(chunk, dtype=np.uint64).sum(dtype=np.uint64))
+            end_time = time.time()
+
+            mb_rate = bytes_total/(end_time-start_time)/1e6
+            print('Read size: {} MB - {} - MB Rate: {}'.format(mb, method, round(mb_rate, 2)))
+            results.append({'read_size': read_size, 'method': method, 'mb_rate': mb_rate})
+
+    return results
 
-        self.pos += bytes_out
 
-        return byte_data
+runtime_bins = np.linspace(0, 50, 50)
 
+# S3 rejects multipart uploads with parts, except the last one, under 5MB
+MIN_PART_SIZE_MB = 5
 
-runtime_bins = np.linspace(0, 50, 50)
 
+def multipart_put_object(storage, bucket_name, key_name, data, part_size, upload_threads):
+    """
+    Uploads data as an S3 multipart upload, where parts are read
+    from data and uploaded concurrently by a pool of threads.
+    Returns the per-part timings.
+    """
+    client = storage.get_client()
+    if not hasattr(client, 'create_multipart_upload'):
+        raise ValueError('Multipart upload mode requires an S3-compatible storage backend')
+
+    bytes_total = len(data)
+    n_parts = max(1, -(-bytes_total // part_size))
+    data_lock = threading.Lock()
+
+    mpu = client.create_multipart_upload(Bucket=bucket_name, Key=key_name)
+    upload_id = mpu['UploadId']
+
+    def upload_part(part_number):
+        offset = (part_number - 1) * part_size
+        with data_lock:
+            data.seek(offset)
+            body = data.read(part_size)
+        start_time = time.time()
+        resp = client.upload_part(Bucket=bucket_name, Key=key_name, UploadId=upload_id,
+                                  PartNumber=part_number, Body=body)
+        end_time = time.time()
+        mb_rate = len(body)/(end_time-start_time)/1e6
+        return {'part_number': part_number, 'etag': resp['ETag'], 'bytes': len(body),
+                'start_time': start_time, 'end_time': end_time, 'mb_rate': mb_rate}
+
+    try:
+        with ThreadPoolExecutor(max_workers=upload_threads) as pool:
+            parts = list(pool.map(upload_part, range(1, n_parts + 1)))
+        client.complete_multipart_upload(
+            Bucket=bucket_name, Key=key_name, UploadId=upload_id,
+            MultipartUpload={'Parts': [{'PartNumber': p['part_number'], 'ETag': p['etag']} for p in parts]})
+    except Exception:
+        client.abort_multipart_upload(Bucket=bucket_name, Key=key_name, UploadId=upload_id)
+        raise
 
-def write(backend, storage, bucket_name, mb_per_file, number, key_prefix, debug):
+    for p in parts:
+        del p['etag']
+
+    return parts
+
+
+KEY_LAYOUTS = ['flat', 'hash', 'date']
+
+
+def create_keynames(number, key_prefix, key_layout, key_shards):
+    """
+    Creates a list of random keys following a key layout, appended as
+    is to key_prefix, which should end with '/' to be a directory:
+    flat: all keys under key_prefix, e.g. <key_prefix><key>
+    hash: keys spread over key_shards hash prefixes, e.g. <key_prefix>a/<key>
+    date: keys spread over key_shards hourly date-partitioned prefixes, the
+    current hour and the ones before it, e.g. <key_prefix>2020/01/31/23/<key>
+    """
+    if key_layout != 'flat' and key_shards < 1:
+        raise ValueError('The {} key layout requires at least 1 key shard'.format(key_layout))
+    keys = [str(uuid.uuid4().hex.upper()) for unused in range(number)]
+
+    if key_layout == 'flat':
+        return [key_prefix + key for key in keys]
+    if key_layout == 'hash':
+        width = len('{:x}'.format(max(key_shards - 1, 1)))
+        return ['{}{:0{}x}/{}'.format(key_prefix, int(hashlib.md5(key.encode()).hexdigest(), 16) % key_shards, width, key)
+                for key in keys]
+    if key_layout == 'date':
+        now = time.time()
+        date_prefixes = [time.strftime('%Y/%m/%d/%H/', time.gmtime(now - hours * 3600)) for hours in range(key_shards)]
+        return [key_prefix + date_prefixes[i % key_shards] + key for i, key in enumerate(keys)]
+    raise ValueError('Unknown key layout {}, choose one of {}'.format(key_layout, KEY_LAYOUTS))
+
+
+def write(backend, storage, bucket_name, mb_per_file, number, key_prefix, key_layout, key_shards,
+          part_size, upload_threads, results_path, debug):
 
     def write_object(key_name, storage):
         bytes_n = mb_per_file * 1024**2
         d = RandomDataGenerator(bytes_n)
         print(key_name)
         start_time = time.time()
-        storage.put_object(bucket_name, key_name, d)
+        if part_size:
+            parts = multipart_put_object(storage, bucket_name, key_name, d,
+                                         part_size * 1024**2, upload_threads)
+        else:
+            storage.put_object(bucket_name, key_name, d)
         end_time = time.time()
 
         mb_rate = bytes_n/(end_time-start_time)/1e6
         print('MB Rate: '+str(mb_rate))
 
-        return {'start_time': start_time, 'end_time': end_time, 'mb_rate': mb_rate}
+        res = {'start_time': start_time, 'end_time': end_time, 'mb_rate': mb_rate}
+        if part_size:
+            res['parts'] = parts
+        return res
 
     # create list of random keys
-    keynames = [key_prefix + str(uuid.uuid4().hex.upper()) for unused in range(number)]
+    keynames = create_keynames(number, key_prefix, key_layout, key_shards)
 
     log_level = 'INFO' if not debug else 'DEBUG'
     fexec = FunctionExecutor(backend=backend, storage=storage, runtime_memory=1024, log_level=log_level)
     start_time = time.time()
+    log = ResultLog(results_path,
+                    start_time=start_time,
+                    bucket_name=bucket_name,
+                    keynames=keynames,
+                    key_layout=key_layout,
+                    key_shards=key_shards,
+                    part_size=part_size,
+                    upload_threads=upload_threads)
     worker_futures = fexec.map(write_object, keynames)
-    results = fexec.get_result(throw_except=False)
+    wait_and_log(fexec, worker_futures, log)
     end_time = time.time()
     total_time = end_time-start_time
-    results = [gbs for gbs in results if gbs is not None]
-    worker_stats = [f.stats for f in worker_futures if not f.error]
 
-    res = {'start_time': start_time,
-           'total_time': total_time,
-           'worker_stats': worker_stats,
-           'bucket_name': bucket_name,
-           'keynames': keynames,
-           'results': results}
+    results = [f.result(throw_except=False) for f in worker_futures if not f.error]
+    # multipart uploads also create and complete the upload
+    puts = sum(len(r['parts']) + 2 if 'parts' in r else 1 for r in results if r is not None)
+    gb = len(results) * mb_per_file * 1024**2 / 1e9
+    cost = executor_cost(fexec, worker_futures, 1024, puts=puts, gb=gb)
+    print_cost(cost)
+    log.close(total_time=total_time, cost=cost)
 
-    return res
+    return load_run(results_path, stats_keys=TIMELINE_STATS)
 
 
-def read(backend, storage, bucket_name, number, keylist_raw, read_times, debug):
+def parallel_get_object(storage, bucket_name, key_name, range_size, read_threads, blocksize=1024*1024,
+                        on_data=None):
+    """
+    Reads an object by fetching byte ranges of range_size bytes
+    concurrently with a pool of threads. Every range is streamed
+    straight into its slice of a single preallocated buffer.
+    on_data is called from the calling thread with the data in object
+    order, in blocks of blocksize bytes, as soon as a range and all the
+    ones before it have arrived, so it overlaps with the ranges still
+    being read without ever stalling them.
+
+    Returns the buffer, the wall time spent on the range requests and,
+    for every range request, its time to first byte, its block
+    inter-arrival times and its total time.
+    """
+    meta = storage.head_object(bucket_name, key_name)
+    bytes_total = int(meta['content-length'])
+    data = bytearray(bytes_total)
+    view = memoryview(data)
+
+    def get_range(offset):
+        end = min(offset + range_size, bytes_total)
+        extra_get_args = {'Range': 'bytes={}-{}'.format(offset, end - 1)}
+        t_request = time.perf_counter()
+        fileobj = storage.get_object(bucket_name, key_name, stream=True, extra_get_args=extra_get_args)
+        # the streaming body is returned once the response headers arrive
+        t_block = time.perf_counter()
+        ttfb = t_block - t_request
+        block_times = []
+        pos = offset
+        while pos < end:
+            buf = fileobj.read(min(blocksize, end - pos))
+            if len(buf) == 0:
+                break
+            t_now = time.perf_counter()
+            block_times.append(t_now - t_block)
+            t_block = t_now
+            view[pos:pos + len(buf)] = buf
+            pos += len(buf)
+        return pos - offset, ttfb, block_times, t_block - t_request, t_request, t_block
+
+    timings = []
+    with ThreadPoolExecutor(max_workers=read_threads) as pool:
+        futures = [(offset, pool.submit(get_range, offset)) for offset in range(0, bytes_total, range_size)]
+        # ranges are waited for in object order, so the blocks handed to
+        # on_data are in order and the reading threads are never blocked
+        for offset, future in futures:
+            timing = future.result()
+            timings.append(timing)
+            if on_data is not None:
+                stop = offset + timing[0]
+                for pos in range(offset, stop, blocksize):
+                    on_data(view[pos:min(pos + blocksize, stop)])
+
+    bytes_read = sum(t[0] for t in timings)
+    if bytes_read != bytes_total:
+        raise IOError('Read {} of {} bytes from {}'.format(bytes_read, bytes_total, key_name))
+
+    # only the range requests are timed, not the time spent in on_data
+    io_time = max(t[5] for t in timings) - min(t[4] for t in timings) if timings else 0.0
+
+    return view, io_time, [t[1:4] for t in timings]
+
+
+def read(backend, storage, bucket_name, number, keylist_raw, read_times, range_size, read_threads, checksum, results_path, debug):
 
     blocksize = 1024*1024
 
     def read_object(key_name, storage):
-        m = hashlib.md5()
+        hasher = ChecksumPipeline(checksum)
+        ttfb_hist = LatencyHistogram()
+        block_hist = LatencyHistogram()
+        get_hist = LatencyHistogram()
         bytes_read = 0
+        io_time = 0.0
         print(key_name)
 
         start_time = time.time()
         for unused in range(read_times):
-            fileobj = storage.get_object(bucket_name, key_name, stream=True)
+            if range_size:
+                try:
+                    data, get_io_time, timings = parallel_get_object(storage, bucket_name, key_name,
+                                                                     range_size * 1024**2, read_threads, blocksize,
+                                                                     on_data=hasher.update)
+                    io_time += get_io_time
+                    for ttfb, block_times, get_time in timings:
+                        ttfb_hist.record(ttfb)
+                        block_hist.record_many(block_times)
+                        get_hist.record(get_time)
+                    bytes_read += len(data)
+                except Exception as e:
+                    print(e)
+                continue
+            t_request = time.perf_counter()
             try:
-                buf = fileobj.read(blocksize)
-                while len(buf) > 0:
-                    bytes_read += len(buf)
-                    #if bytes_read % (blocksize *10) == 0:
-                    #    mb_rate = bytes_read/(time.time()-t1)/1e6
-                    #    print('POS:'+str(bytes_read)+' MB Rate: '+ str(mb_rate))
-                    m.update(buf)
+                fileobj = storage.get_object(bucket_name, key_name, stream=True)
+                # the streaming body is returned once the response headers arrive
+                t_block = time.perf_counter()
+                ttfb_hist.record(t_block - t_request)
+                io_time += t_block - t_request
+                while True:
+                    t0 = time.perf_counter()
                     buf = fileobj.read(blocksize)
+                    t_now = time.perf_counter()
+                    io_time += t_now - t0
+                    if len(buf) == 0:
+                        break
+                    block_hist.record(t_now - t_block)
+                    t_block = t_now
+                    bytes_read += len(buf)
+                    hasher.update(buf)
+                get_hist.record(t_block - t_request)
             except Exception as e:
                 print(e)
                 pass
+        digest = hasher.close()
         end_time = time.time()
         mb_rate = bytes_read/(end_time-start_time)/1e6
         print('MB Rate: '+str(mb_rate))
 
-        return {'start_time': start_time, 'end_time': end_time, 'mb_rate': mb_rate, 'bytes_read': bytes_read}
+        res = {'start_time': start_time, 'end_time': end_time, 'mb_rate': mb_rate, 'bytes_read': bytes_read,
+               'io_time': io_time, 'checksum': digest,
+               'ttfb_hist': ttfb_hist.counts, 'block_hist': block_hist.counts, 'get_hist': get_hist.counts}
+        res.update(hasher.stats())
+        return res
 
     if number == 0:
         keynames = keylist_raw
@@ -185,36 +469,319 @@ def read(backend, storage, bucket_name, number, keylist_raw, read_times, debug):
     log_level = 'INFO' if not debug else 'DEBUG'
     fexec = FunctionExecutor(backend=backend, storage=storage, runtime_memory=1024, log_level=log_level)
     start_time = time.time()
+    log = ResultLog(results_path,
+                    start_time=start_time,
+                    range_size=range_size,
+                    read_threads=read_threads,
+                    checksum=checksum)
     worker_futures = fexec.map(read_object, keynames)
+    wait_and_log(fexec, worker_futures, log)
+    end_time = time.time()
+    total_time = end_time-start_time
+
+    results = [r for r in (f.result(throw_except=False) for f in worker_futures if not f.error) if r is not None]
+    gets = sum(int(np.sum(r['get_hist'])) for r in results)
+    gb = sum(r['bytes_read'] for r in results) / 1e9
+    cost = executor_cost(fexec, worker_futures, 1024, gets=gets, gb=gb)
+    print_cost(cost)
+    log.close(total_time=total_time, cost=cost)
+
+    return load_run(results_path, stats_keys=TIMELINE_STATS)
+
+
+LATENCY_PERCENTILES = {'p50': 50, 'p90': 90, 'p99': 99, 'p999': 99.9}
+
+
+def latency_summary(latencies, start_time, end_time):
+    """
+    Summarizes an array of request latencies (in ms) into ops/s
+    and latency percentiles.
+    """
+    res = {'ops': len(latencies),
+           'ops_rate': len(latencies)/(end_time-start_time) if end_time > start_time else 0.0}
+    if len(latencies) > 0:
+        percentiles = np.percentile(latencies, list(LATENCY_PERCENTILES.values()))
+        res.update(dict(zip(LATENCY_PERCENTILES.keys(), percentiles.tolist())))
+    return res
+
+
+def iops(backend, storage, bucket_name, kb_per_object, ops_per_worker, number, key_prefix, debug):
+
+    def iops_object(worker_id, storage):
+        payload = RandomDataGenerator(kb_per_object * 1024).read()
+        keynames = ['{}{}/{}'.format(key_prefix, worker_id, i) for i in range(ops_per_worker)]
+        res = {'keynames': keynames}
+
+        for op in ['put', 'get']:
+            latencies = np.zeros(ops_per_worker, dtype=np.float32)
+            errors = 0
+            start_time = time.time()
+            for i, key_name in enumerate(keynames):
+                t0 = time.perf_counter()
+                try:
+                    if op == 'put':
+                        storage.put_object(bucket_name, key_name, payload)
+                    else:
+                        storage.get_object(bucket_name, key_name)
+                except Exception as e:
+                    print(e)
+                    errors += 1
+                    latencies[i] = np.nan
+                    continue
+                latencies[i] = (time.perf_counter() - t0) * 1000
+            end_time = time.time()
+
+            latencies = latencies[~np.isnan(latencies)]
+            res[op] = latency_summary(latencies, start_time, end_time)
+            res[op].update({'start_time': start_time, 'end_time': end_time,
+                            'errors': errors, 'latencies': latencies})
+            print('{} - ops/s: {}'.format(op.upper(), res[op]['ops_rate']))
+
+        return res
+
+    worker_ids = [uuid.uuid4().hex.upper() for unused in range(number)]
+
+    log_level = 'INFO' if not debug else 'DEBUG'
+    fexec = FunctionExecutor(backend=backend, storage=storage, runtime_memory=1024, log_level=log_level)
+    start_time = time.time()
+    worker_futures = fexec.map(iops_object, worker_ids)
     results = fexec.get_result(throw_except=False)
     end_time = time.time()
     total_time = end_time-start_time
+    results = [r for r in results if r is not None]
+    worker_stats = [f.stats for f in worker_futures if not f.error]
 
-    results = [gbs for gbs in results if gbs is not None]
+    keynames = [key_name for r in results for key_name in r.pop('keynames')]
+
+    aggregated = {}
+    for op in ['put', 'get']:
+        if not results:
+            break
+        latencies = np.concatenate([r[op]['latencies'] for r in results])
+        op_start = min(r[op]['start_time'] for r in results)
+        op_end = max(r[op]['end_time'] for r in results)
+        aggregated[op] = latency_summary(latencies, op_start, op_end)
+        aggregated[op]['errors'] = sum(r[op]['errors'] for r in results)
+        print('{} - ops/s: {} - latency ms: {}'.format(
+            op.upper(), round(aggregated[op]['ops_rate'], 2),
+            ', '.join('{}={}'.format(p, round(aggregated[op][p], 2)) for p in LATENCY_PERCENTILES
+                      if p in aggregated[op])))
+
+    res = {'start_time': start_time,
+           'total_time': total_time,
+           'worker_stats': worker_stats,
+           'bucket_name': bucket_name,
+           'keynames': keynames,
+           'kb_per_object': kb_per_object,
+           'ops_per_worker': ops_per_worker,
+           'aggregated': aggregated,
+           'results': results}
+
+    return res
+
+
+def mixed(backend, storage, bucket_name, kb_per_object, n_keys, number, ops_per_worker, read_ratio,
+          distribution, zipf_skew, hot_fraction, hot_ops_fraction, duration, key_prefix, debug):
+
+    def mixed_key_name(idx):
+        return '{}mixed/{:010d}'.format(key_prefix, idx)
+
+    def populate_objects(key_range, storage):
+        payload = RandomDataGenerator(kb_per_object * 1024).read()
+        for idx in range(*key_range):
+            storage.put_object(bucket_name, mixed_key_name(idx), payload)
+
+    def mixed_object(key_idx, is_read, storage):
+        payload = RandomDataGenerator(kb_per_object * 1024).read()
+        n_ops = len(key_idx)
+        max_ops = n_ops
+        timestamps = np.zeros(max_ops, dtype=np.float64)
+        latencies = np.zeros(max_ops, dtype=np.float32)
+        statuses = np.zeros(max_ops, dtype=np.int8)
+        op_is_read = np.zeros(max_ops, dtype=bool)
+
+        start_time = time.time()
+        deadline = start_time + duration
+        i = 0
+        while time.time() < deadline:
+            if i == max_ops:
+                max_ops *= 2
+                timestamps.resize(max_ops, refcheck=False)
+                latencies.resize(max_ops, refcheck=False)
+                statuses.resize(max_ops, refcheck=False)
+                op_is_read.resize(max_ops, refcheck=False)
+            key_name = mixed_key_name(key_idx[i % n_ops])
+            op_is_read[i] = is_read[i % n_ops]
+            t0 = time.perf_counter()
+            try:
+                if op_is_read[i]:
+                    storage.get_object(bucket_name, key_name)
+                else:
+                    storage.put_object(bucket_name, key_name, payload)
+                statuses[i] = OP_OK
+            except Exception as e:
+                statuses[i] = OP_THROTTLED if is_throttling_error(e) else OP_ERROR
+            latencies[i] = (time.perf_counter() - t0) * 1000
+            timestamps[i] = time.time()
+            i += 1
+        end_time = time.time()
+
+        ok = statuses[:i] == OP_OK
+        print('Ops/s: {}'.format(ok.sum()/(end_time-start_time)))
+
+        return {'start_time': start_time, 'end_time': end_time,
+                'timestamps': timestamps[:i], 'latencies': latencies[:i],
+                'statuses': statuses[:i], 'is_read': op_is_read[:i]}
+
+    log_level = 'INFO' if not debug else 'DEBUG'
+    fexec = FunctionExecutor(backend=backend, storage=storage, runtime_memory=1024, log_level=log_level)
+
+    # populate the keyspace, so reads never hit missing keys
+    keys_per_worker = -(-n_keys // number)
+    key_ranges = [(i, min(i + keys_per_worker, n_keys)) for i in range(0, n_keys, keys_per_worker)]
+    populate_futures = fexec.map(populate_objects, key_ranges)
+    fexec.get_result(fs=populate_futures)
+    keynames = [mixed_key_name(idx) for idx in range(n_keys)]
+
+    key_idx, is_read = build_schedule(n_keys, number * ops_per_worker, read_ratio, distribution,
+                                      zipf_skew, hot_fraction, hot_ops_fraction)
+    iterable = [(key_idx[i*ops_per_worker:(i+1)*ops_per_worker], is_read[i*ops_per_worker:(i+1)*ops_per_worker])
+                for i in range(number)]
+
+    start_time = time.time()
+    worker_futures = fexec.map(mixed_object, iterable)
+    results = fexec.get_result(fs=worker_futures, throw_except=False)
+    end_time = time.time()
+    total_time = end_time-start_time
+    results = [r for r in results if r is not None]
     worker_stats = [f.stats for f in worker_futures if not f.error]
 
+    timeline = {}
+    if results:
+        statuses = np.concatenate([r['statuses'] for r in results])
+        timeline = ops_timeline(np.concatenate([r['timestamps'] for r in results]) - start_time,
+                                statuses, np.concatenate([r['is_read'] for r in results]))
+        n_ops = len(statuses)
+        print('Total ops: {} - Throttled: {:.2%} - Errors: {:.2%}'.format(
+            n_ops, np.mean(statuses == OP_THROTTLED), np.mean(statuses == OP_ERROR)))
+
     res = {'start_time': start_time,
            'total_time': total_time,
            'worker_stats': worker_stats,
+           'bucket_name': bucket_name,
+           'keynames': keynames,
+           'kb_per_object': kb_per_object,
+           'read_ratio': read_ratio,
+           'distribution': distribution,
+           'zipf_skew': zipf_skew,
+           'hot_fraction': hot_fraction,
+           'hot_ops_fraction': hot_ops_fraction,
+           'duration': duration,
+           'timeline': timeline,
            'results': results}
 
     return res
 
 
-def delete_temp_data(storage, bucket_name, keynames):
+def delete_temp_data(storage, bucket_name, keynames=None, prefix=None, backend=None, batch_size=DELETE_BATCH_SIZE,
+                     threads=16, debug=False):
     print('Deleting temp files...')
-    storage = Storage(backend=storage)
-    try:
-        storage.delete_objects(bucket_name, keynames)
-    except:
-        pass
-    print('Done!')
+    if backend is not None:
+        if keynames is None:
+            keynames = Storage(backend=storage).list_keys(bucket_name, prefix)
+        log_level = 'INFO' if not debug else 'DEBUG'
+        fexec = FunctionExecutor(backend=backend, storage=storage, runtime_memory=1024, log_level=log_level)
+        summary = delete_objects_map(fexec, bucket_name, keynames, batch_size=batch_size, threads=threads)
+    else:
+        summary = delete_objects_parallel(Storage(backend=storage), bucket_name, keynames, prefix,
+                                          batch_size=batch_size, threads=threads)
+    print_delete_summary(summary)
+    return summary
+
+
+def aggregate_bandwidth(res, bytes_per_result=None):
+    """
+    Returns the aggregate GB/s of a write or read test, as the bytes
+    transferred by all the functions over the time from the first
+    function starting to the last one finishing.
+    """
+    results = res['results']
+    if not results:
+        return 0.0
+    if bytes_per_result is None:
+        bytes_total = sum(r['bytes_read'] for r in results)
+    else:
+        bytes_total = bytes_per_result * len(results)
+    span = max(r['end_time'] for r in results) - min(r['start_time'] for r in results)
+    return bytes_total / span / 1e9 if span > 0 else 0.0
+
+
+def sweep(backend, storage, bucket_name, mb_sizes, workers_start, workers_max, workers_factor,
+          min_gain, max_error_rate, key_prefix, outdir, name, debug):
+    """
+    Runs the write and read tests at geometrically increasing numbers of
+    functions for every object size, until the marginal aggregate bandwidth
+    gain falls below min_gain or the error rate exceeds max_error_rate.
+    """
+    rows = []
+    for mb_per_file in mb_sizes:
+        prev_row = None
+        number = workers_start
+        while number <= workers_max:
+            print('Executing sweep test: {} functions - {} MB per object'.format(number, mb_per_file))
+            run_name = '{}_{}MB_{}'.format(name, mb_per_file, number)
+            res_write = write(backend, storage, bucket_name, mb_per_file, number, key_prefix, 'flat', 0, 0, 0,
+                              '{}/{}_write.jsonl'.format(outdir, run_name), debug)
+            res_read = read(backend, storage, bucket_name, 0, res_write['keynames'], 1, 0, 0, 'none',
+                            '{}/{}_read.jsonl'.format(outdir, run_name), debug)
+            delete_temp_data(storage, bucket_name, res_write['keynames'])
+
+            row = {'mb_per_file': mb_per_file,
+                   'workers': number,
+                   'write_gbs': aggregate_bandwidth(res_write, mb_per_file * 1024**2),
+                   'read_gbs': aggregate_bandwidth(res_read),
+                   'write_error_rate': 1 - len(res_write['results']) / number,
+                   'read_error_rate': 1 - len(res_read['results']) / number}
+            rows.append(row)
+            print('Write: {} GB/s - Read: {} GB/s'.format(round(row['write_gbs'], 3), round(row['read_gbs'], 3)))
+
+            if max(row['write_error_rate'], row['read_error_rate']) > max_error_rate:
+                print('Error rate above {}, stopping'.format(max_error_rate))
+                break
+            if prev_row is not None:
+                gains = [(row[k] - prev_row[k]) / prev_row[k] for k in ['write_gbs', 'read_gbs'] if prev_row[k] > 0]
+                if gains and max(gains) < min_gain:
+                    print('Aggregate bandwidth gain below {}, stopping'.format(min_gain))
+                    break
+            prev_row = row
+            number = max(number + 1, int(round(number * workers_factor)))
+
+    return pd.DataFrame(rows)
+
+
+def results_path(outdir, name, test):
+    """
+    Returns the result log of a test, or its legacy pickle if
+    there is no result log
+    """
+    path = '{}/{}_{}.jsonl'.format(outdir, name, test)
+    if not os.path.exists(path) and os.path.exists('{}/{}_{}.pickle'.format(outdir, name, test)):
+        path = '{}/{}_{}.pickle'.format(outdir, name, test)
+    return path
 
 
 def create_plots(res_write, res_read, outdir, name):
     create_execution_histogram(res_write, res_read, f"{outdir}/{name}_execution.png")
     create_rates_histogram(res_write, res_read, f"{outdir}/{name}_rates.png")
     create_agg_bdwth_plot(res_write, res_read, f"{outdir}/{name}_agg_bdwth.png")
+    if any('ttfb_hist' in r for r in res_read['results']):
+        create_latency_cdf_plot(res_read, f"{outdir}/{name}_latency_cdf.png")
+
+
+def validate_part_size(ctx, param, value):
+    if 0 < value < MIN_PART_SIZE_MB:
+        raise click.BadParameter('parts must be at least {} MB, or 0 to disable multipart uploads'.format(MIN_PART_SIZE_MB))
+    return value
 
 
 @click.group()
@@ -226,69 +793,189 @@ def cli():
 @click.option('--backend', '-b', default='aws_lambda', help='compute backend name', type=str)
 @click.option('--storage', '-s', default='aws_s3', help='storage backend name', type=str)
 @click.option('--bucket_name', help='bucket to save files in')
-@click.option('--mb_per_file', help='MB of each object', type=int)
-@click.option('--number', help='number of files', type=int)
+@click.option('--mb_per_file', help='MB of each object', type=click.IntRange(min=1))
+@click.option('--number', help='number of files', type=click.IntRange(min=1))
 @click.option('--key_prefix', default='', help='Object key prefix')
+@click.option('--key_layout', default='flat', help='layout of the object keys', type=click.Choice(KEY_LAYOUTS))
+@click.option('--key_shards', default=16, help='number of hash prefixes or hourly date partitions for the hash and date key layouts',
+              type=click.IntRange(min=1))
+@click.option('--part_size', default=0, help='MB of each part for multipart uploads, 0 to disable', type=int,
+              callback=validate_part_size)
+@click.option('--upload_threads', default=4, help='number of threads uploading parts within each function',
+              type=click.IntRange(min=1))
 @click.option('--outdir', default='.', help='dir to save results in')
 @click.option('--name', default=None, help='filename to save results in')
 @click.option('--debug', '-d', is_flag=True, help='debug mode')
-def write_command(backend, storage, bucket_name, mb_per_file, number, key_prefix, outdir, name, debug):
+def write_command(backend, storage, bucket_name, mb_per_file, number, key_prefix, key_layout, key_shards, part_size, upload_threads, outdir, name, debug):
     if name is None:
         name = number
     if bucket_name is None:
         raise ValueError('You must provide a bucket name within --bucket_name parameter')
-    res_write = write(backend, storage, bucket_name, mb_per_file, number, key_prefix, debug)
-    pickle.dump(res_write, open('{}/{}_write.pickle'.format(outdir, name), 'wb'), -1)
+    write(backend, storage, bucket_name, mb_per_file, number, key_prefix, key_layout, key_shards, part_size, upload_threads,
+          '{}/{}_write.jsonl'.format(outdir, name), debug)
 
 
 @cli.command('read')
 @click.option('--backend', '-b', default='aws_lambda', help='compute backend name', type=str)
 @click.option('--storage', '-s', default='aws_s3', help='storage backend name', type=str)
 @click.option('--key_file', default=None, help="filename generated by write command, which contains the keys to read")
-@click.option('--number', help='number of objects to read, 0 for all', type=int, default=0)
+@click.option('--number', help='number of objects to read, 0 for all', type=click.IntRange(min=0), default=0)
 @click.option('--outdir', default='.', help='dir to save results in')
 @click.option('--name', default=None, help='filename to save results in')
-@click.option('--read_times', default=1, help="number of times to read each COS key")
+@click.option('--read_times', default=1, help="number of times to read each COS key", type=click.IntRange(min=1))
+@click.option('--range_size', default=0, help='MB of each byte range for parallel range reads, 0 to disable',
+              type=click.IntRange(min=0))
+@click.option('--read_threads', default=4, help='number of threads reading ranges within each function',
+              type=click.IntRange(min=1))
+@click.option('--checksum', default='md5', help='checksum computed over the data read', type=click.Choice(CHECKSUMS))
 @click.option('--debug', '-d', is_flag=True, help='debug mode')
-def read_command(backend, storage, key_file, number, outdir, name, read_times, debug):
+def read_command(backend, storage, key_file, number, outdir, name, read_times, range_size, read_threads, checksum, debug):
     if name is None:
         name = number
-    if key_file:
-        res_write = pickle.load(open(key_file, 'rb'))
-    else:
-        res_write = pickle.load(open('{}/{}_write.pickle'.format(outdir, name), 'rb'))
+    res_write = load_run(key_file or results_path(outdir, name, 'write'), stats_keys=[])
     bucket_name = res_write['bucket_name']
     keynames = res_write['keynames']
-    res_read = read(backend, storage, bucket_name, number, keynames, read_times, debug)
-    pickle.dump(res_read, open('{}/{}_read.pickle'.format(outdir, name), 'wb'), -1)
+    read(backend, storage, bucket_name, number, keynames, read_times, range_size, read_threads, checksum,
+         '{}/{}_read.jsonl'.format(outdir, name), debug)
 
 
 @cli.command('delete')
+@click.option('--backend', '-b', default=None, help='compute backend name to delete from functions, deletes from this machine if not set', type=str)
+@click.option('--storage', '-s', default='aws_s3', help='storage backend name', type=str)
 @click.option('--key_file', default=None, help="filename generated by write command, which contains the keys to read")
+@click.option('--bucket_name', default=None, help='bucket to delete the objects under --prefix from')
+@click.option('--prefix', default=None, help='delete all the objects under this prefix instead of the keys of a write test')
+@click.option('--batch_size', default=DELETE_BATCH_SIZE, help='number of keys deleted by each request',
+              type=click.IntRange(min=1))
+@click.option('--threads', default=16, help='number of threads deleting batches', type=click.IntRange(min=1))
 @click.option('--outdir', default='.', help='dir to save results in')
 @click.option('--name', default='os_benchmark', help='filename to save results in')
-def delete_command(key_file, outdir, name):
-    if key_file:
-        res_write = pickle.load(open(key_file, 'rb'))
+@click.option('--debug', '-d', is_flag=True, help='debug mode')
+def delete_command(backend, storage, key_file, bucket_name, prefix, batch_size, threads, outdir, name, debug):
+    if prefix is not None:
+        if bucket_name is None:
+            raise ValueError('You must provide a bucket name within --bucket_name parameter')
+        keynames = None
     else:
-        res_write = pickle.load(open('{}/{}_write.pickle'.format(outdir, name), 'rb'))
-    bucket_name = res_write['bucket_name']
-    keynames = res_write['keynames']
-    delete_temp_data(bucket_name, keynames)
+        res_write = load_run(key_file or results_path(outdir, name, 'write'), stats_keys=[])
+        bucket_name = res_write['bucket_name']
+        keynames = res_write['keynames']
+    delete_temp_data(storage, bucket_name, keynames, prefix, backend, batch_size, threads, debug)
+
+
+@cli.command('iops')
+@click.option('--backend', '-b', default='aws_lambda', help='compute backend name', type=str)
+@click.option('--storage', '-s', default='aws_s3', help='storage backend name', type=str)
+@click.option('--bucket_name', help='bucket to save files in')
+@click.option('--kb_per_object', default=4, help='KB of each object', type=click.IntRange(min=1))
+@click.option('--ops_per_worker', default=1000, help='number of objects each function puts and gets',
+              type=click.IntRange(min=1))
+@click.option('--number', help='number of functions', type=click.IntRange(min=1))
+@click.option('--key_prefix', default='', help='Object key prefix')
+@click.option('--outdir', default='.', help='dir to save results in')
+@click.option('--name', default=None, help='filename to save results in')
+@click.option('--debug', '-d', is_flag=True, help='debug mode')
+def iops_command(backend, storage, bucket_name, kb_per_object, ops_per_worker, number, key_prefix, outdir, name, debug):
+    if name is None:
+        name = number
+    if bucket_name is None:
+        raise ValueError('You must provide a bucket name within --bucket_name parameter')
+    res_iops = iops(backend, storage, bucket_name, kb_per_object, ops_per_worker, number, key_prefix, debug)
+    pickle.dump(res_iops, open('{}/{}_iops.pickle'.format(outdir, name), 'wb'), -1)
+    delete_temp_data(storage, bucket_name, res_iops['keynames'])
+
+
+@cli.command('mixed')
+@click.option('--backend', '-b', default='aws_lambda', help='compute backend name', type=str)
+@click.option('--storage', '-s', default='aws_s3', help='storage backend name', type=str)
+@click.option('--bucket_name', help='bucket to save files in')
+@click.option('--kb_per_object', default=64, help='KB of each object', type=click.IntRange(min=1))
+@click.option('--keys', 'n_keys', default=10000, help='number of keys in the keyspace', type=click.IntRange(min=1))
+@click.option('--number', help='number of functions', type=click.IntRange(min=1))
+@click.option('--ops_per_worker', default=1000, help='length of the key schedule of each function',
+              type=click.IntRange(min=1))
+@click.option('--read_ratio', default=0.8, help='fraction of operations which are reads', type=float)
+@click.option('--distribution', default='zipf', help='key popularity distribution', type=click.Choice(DISTRIBUTIONS))
+@click.option('--zipf_skew', default=1.0, help='skew of the zipf distribution', type=float)
+@click.option('--hot_fraction', default=0.1, help='fraction of hot keys for the hotspot distribution', type=float)
+@click.option('--hot_ops_fraction', default=0.9, help='fraction of operations going to hot keys', type=float)
+@click.option('--duration', default=60, help='seconds each function runs for', type=click.IntRange(min=1))
+@click.option('--key_prefix', default='', help='Object key prefix')
+@click.option('--outdir', default='.', help='dir to save results in')
+@click.option('--name', default=None, help='filename to save results in')
+@click.option('--debug', '-d', is_flag=True, help='debug mode')
+def mixed_command(backend, storage, bucket_name, kb_per_object, n_keys, number, ops_per_worker, read_ratio, distribution,
+                  zipf_skew, hot_fraction, hot_ops_fraction, duration, key_prefix, outdir, name, debug):
+    if name is None:
+        name = number
+    if bucket_name is None:
+        raise ValueError('You must provide a bucket name within --bucket_name parameter')
+    res_mixed = mixed(backend, storage, bucket_name, kb_per_object, n_keys, number, ops_per_worker, read_ratio,
+                      distribution, zipf_skew, hot_fraction, hot_ops_fraction, duration, key_prefix, debug)
+    pickle.dump(res_mixed, open('{}/{}_mixed.pickle'.format(outdir, name), 'wb'), -1)
+    delete_temp_data(storage, bucket_name, res_mixed['keynames'])
+    if res_mixed['timeline']:
+        create_mixed_timeline_plot(res_mixed, '{}/{}_mixed_timeline.png'.format(outdir, name))
+
+
+@cli.command('sweep')
+@click.option('--backend', '-b', default='aws_lambda', help='compute backend name', type=str)
+@click.option('--storage', '-s', default='aws_s3', help='storage backend name', type=str)
+@click.option('--bucket_name', help='bucket to save files in')
+@click.option('--mb_sizes', default='64,512', help='comma-separated MB of each object')
+@click.option('--workers_start', default=10, help='number of functions of the first test', type=click.IntRange(min=1))
+@click.option('--workers_max', default=1000, help='max number of functions', type=click.IntRange(min=1))
+@click.option('--workers_factor', default=2.0, help='growth factor of the number of functions', type=float)
+@click.option('--min_gain', default=0.1, help='stop when the aggregate bandwidth grows less than this fraction', type=float)
+@click.option('--max_error_rate', default=0.05, help='stop when the fraction of failed functions exceeds this', type=float)
+@click.option('--key_prefix', default='', help='Object key prefix')
+@click.option('--outdir', default='.', help='dir to save results in')
+@click.option('--name', default='sweep', help='filename to save results in')
+@click.option('--debug', '-d', is_flag=True, help='debug mode')
+def sweep_command(backend, storage, bucket_name, mb_sizes, workers_start, workers_max, workers_factor,
+                  min_gain, max_error_rate, key_prefix, outdir, name, debug):
+    if bucket_name is None:
+        raise ValueError('You must provide a bucket name within --bucket_name parameter')
+    mb_sizes = [int(mb) for mb in mb_sizes.split(',')]
+    summary = sweep(backend, storage, bucket_name, mb_sizes, workers_start, workers_max, workers_factor,
+                    min_gain, max_error_rate, key_prefix, outdir, name, debug)
+    print(summary.to_string(index=False))
+    summary.to_csv('{}/{}_summary.csv'.format(outdir, name), index=False)
+    create_sweep_plot(summary, '{}/{}_summary.png'.format(outdir, name))
+
+
+@cli.command('datagen')
+@click.option('--mb_sizes', default='1,16,128,1024', help='comma-separated read sizes in MB')
+@click.option('--total_mb', default=2048, help='MB generated per read size and method', type=click.IntRange(min=1))
+def datagen_command(mb_sizes, total_mb):
+    mb_sizes = [int(mb) for mb in mb_sizes.split(',')]
+    datagen_benchmark(mb_sizes, total_mb)
 
 
 @cli.command('run')
 @click.option('--backend', '-b', default='aws_lambda', help='compute backend name', type=str)
 @click.option('--storage', '-s', default='aws_s3', help='storage backend name', type=str)
 @click.option('--bucket_name', help='bucket to save files in')
-@click.option('--mb_per_file', help='MB of each object', type=int)
-@click.option('--number', help='number of files', type=int)
+@click.option('--mb_per_file', help='MB of each object', type=click.IntRange(min=1))
+@click.option('--number', help='number of files', type=click.IntRange(min=1))
 @click.option('--key_prefix', default='', help='Object key prefix')
+@click.option('--key_layout', default='flat', help='layout of the object keys', type=click.Choice(KEY_LAYOUTS))
+@click.option('--key_shards', default=16, help='number of hash prefixes or hourly date partitions for the hash and date key layouts',
+              type=click.IntRange(min=1))
+@click.option('--part_size', default=0, help='MB of each part for multipart uploads, 0 to disable', type=int,
+              callback=validate_part_size)
+@click.option('--upload_threads', default=4, help='number of threads uploading parts within each function',
+              type=click.IntRange(min=1))
 @click.option('--outdir', default='.', help='dir to save results in')
 @click.option('--name', '-n', default=None, help='filename to save results in')
-@click.option('--read_times', default=1, help="number of times to read each COS key")
+@click.option('--read_times', default=1, help="number of times to read each COS key", type=click.IntRange(min=1))
+@click.option('--range_size', default=0, help='MB of each byte range for parallel range reads, 0 to disable',
+              type=click.IntRange(min=0))
+@click.option('--read_threads', default=4, help='number of threads reading ranges within each function',
+              type=click.IntRange(min=1))
+@click.option('--checksum', default='md5', help='checksum computed over the data read', type=click.Choice(CHECKSUMS))
 @click.option('--debug', '-d', is_flag=True, help='debug mode')
-def run(backend, storage, bucket_name, mb_per_file, number, key_prefix, outdir, name, read_times, debug):
+def run(backend, storage, bucket_name, mb_per_file, number, key_prefix, key_layout, key_shards, part_size, upload_threads, outdir, name, read_times, range_size, read_threads, checksum, debug):
     if name is None:
         name = number
 
@@ -296,20 +983,20 @@ def run(backend, storage, bucket_name, mb_per_file, number, key_prefix, outdir,
         print('Executing Write Test:')
         if bucket_name is None:
             raise ValueError('You must provide a bucket name within --bucket_name parameter')
-        res_write = write(backend, storage, bucket_name, mb_per_file, number, key_prefix, debug)
-        pickle.dump(res_write, open(f'{outdir}/{name}_write.pickle', 'wb'), -1)
+        res_write = write(backend, storage, bucket_name, mb_per_file, number, key_prefix, key_layout, key_shards,
+                          part_size, upload_threads, f'{outdir}/{name}_write.jsonl', debug)
         print('Sleeping 20 seconds...')
         time.sleep(20)
         print('Executing Read Test:')
         bucket_name = res_write['bucket_name']
         keynames = res_write['keynames']
-        res_read = read(backend, storage, bucket_name, number, keynames, read_times, debug)
-        pickle.dump(res_read, open(f'{outdir}/{name}_read.pickle', 'wb'), -1)
+        res_read = read(backend, storage, bucket_name, number, keynames, read_times, range_size, read_threads, checksum,
+                        f'{outdir}/{name}_read.jsonl', debug)
 
         delete_temp_data(storage, bucket_name, keynames)
     else:
-        res_write = pickle.load(open(f'{outdir}/{name}_write.pickle', 'rb'))
-        res_read = pickle.load(open(f'{outdir}/{name}_read.pickle', 'rb'))
+        res_write = load_run(results_path(outdir, name, 'write'), stats_keys=TIMELINE_STATS)
+        res_read = load_run(results_path(outdir, name, 'read'), stats_keys=TIMELINE_STATS)
     create_plots(res_write, res_read, outdir, name)
 
 
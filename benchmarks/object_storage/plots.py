@@ -15,21 +15,26 @@
 #
 
 import os
+import sys
 import pylab
 import logging
 import numpy as np
 import pandas as pd
 import seaborn as sns
-from matplotlib.collections import LineCollection
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.timeline import MAX_TIMELINE_LINES, timeline, draw_function_timelines
+from histograms import merge_histograms
 
 pylab.switch_backend("Agg")
 logger = logging.getLogger(__name__)
 
 READ_COLOR = (0.12156862745098039, 0.4666666666666667, 0.7058823529411765)
 WRITE_COLOR = (1.0, 0.4980392156862745, 0.054901960784313725)
+SWEEP_LINESTYLES = ['-', '--', ':', '-.']
 
 
-def create_execution_histogram(res_write, res_read, dst):
+def create_execution_histogram(res_write, res_read, dst, max_lines=MAX_TIMELINE_LINES):
 
     def compute_times_rates(time_rates):
         x = np.array(time_rates)
@@ -37,20 +42,9 @@ def create_execution_histogram(res_write, res_read, dst):
         tr_start_time = x[:, 0] - tzero
         tr_end_time = x[:, 1] - tzero
 
-        N = len(tr_start_time)
-
-        runtime_calls_hist = np.zeros((N, len(runtime_bins)))
-
-        for i in range(N):
-            s = tr_start_time[i]
-            e = tr_end_time[i]
-            a, b = np.searchsorted(runtime_bins, [s, e])
-            if b-a > 0:
-                runtime_calls_hist[i, a:b] = 1
-
         return {'start_time': tr_start_time,
                 'end_time': tr_end_time,
-                'runtime_calls_hist': runtime_calls_hist}
+                'runtime_calls': timeline(runtime_bins, tr_start_time, tr_end_time)}
 
     fig, axes2d = pylab.subplots(nrows=1, ncols=2, sharex=True, sharey=True, figsize=(5, 5))
 
@@ -69,14 +63,9 @@ def create_execution_histogram(res_write, res_read, dst):
 
         time_hist = compute_times_rates(time_rates)
 
-        N = len(time_hist['start_time'])
-        line_segments = LineCollection([[[time_hist['start_time'][i], i],
-                                         [time_hist['end_time'][i], i]] for i in range(N)],
-                                       linestyles='solid', color='k', alpha=0.6, linewidth=0.4)
-
-        ax.add_collection(line_segments)
+        draw_function_timelines(ax, time_hist['start_time'], time_hist['end_time'], max_seconds, max_lines)
 
-        ax.plot(runtime_bins, time_hist['runtime_calls_hist'].sum(axis=0), label='Parallel {} Functions'.format(l), zorder=-1, c=c)
+        ax.plot(runtime_bins, time_hist['runtime_calls'], label='Parallel {} Functions'.format(l), zorder=-1, c=c)
 
         yplot_step = int(np.max([1, total_calls/20]))
         y_ticks = np.arange(total_calls//yplot_step + 2) * yplot_step
@@ -152,20 +141,10 @@ def create_agg_bdwth_plot(res_write, res_read, dst):
         tr_end_time = x[:, 1] - tzero
         rate = x[:, 2]
 
-        N = len(tr_start_time)
-        runtime_rate_hist = np.zeros((N, len(runtime_bins)))
-
-        for i in range(N):
-            s = tr_start_time[i]
-            e = tr_end_time[i]
-            a, b = np.searchsorted(runtime_bins, [s, e])
-            if b-a > 0:
-                runtime_rate_hist[i, a:b] = rate[i]
-
         return {'start_time': tr_start_time,
                 'end_time': tr_end_time,
                 'rate': rate,
-                'runtime_rate_hist': runtime_rate_hist}
+                'runtime_rate': timeline(runtime_bins, tr_start_time, tr_end_time, rate)}
 
     fig = pylab.figure(figsize=(5, 5))
     ax = fig.add_subplot(1, 1, 1)
@@ -178,7 +157,7 @@ def create_agg_bdwth_plot(res_write, res_read, dst):
 
         mb_rates_hist = compute_times_rates(start_time, mb_rates)
 
-        ax.plot(mb_rates_hist['runtime_rate_hist'].sum(axis=0)/1000, label=l, c=c)
+        ax.plot(mb_rates_hist['runtime_rate']/1000, label=l, c=c)
 
     ax.set_xlabel('Execution Time (sec)')
     ax.set_ylabel("GB/sec")
@@ -191,3 +170,77 @@ def create_agg_bdwth_plot(res_write, res_read, dst):
 
     fig.tight_layout()
     fig.savefig(dst)
+
+
+def create_latency_cdf_plot(res_read, dst):
+    results = [res for res in res_read['results'] if 'ttfb_hist' in res]
+
+    fig = pylab.figure(figsize=(5, 5))
+    ax = fig.add_subplot(1, 1, 1)
+    for key, l in [('ttfb_hist', 'Time to first byte'), ('block_hist', 'Block inter-arrival'), ('get_hist', 'GET total time')]:
+        hist = merge_histograms([res[key] for res in results])
+        if hist.total == 0:
+            continue
+        upper_edges, cdf = hist.cdf()
+        ax.step(upper_edges[:-1], cdf[:-1], where='post', label=l)
+
+    ax.set_xscale('log')
+    ax.set_xlabel('Latency (sec)')
+    ax.set_ylabel('CDF')
+    ax.set_ylim(0, 1.02)
+    pylab.legend(loc='lower right')
+    ax.grid(True)
+
+    dst = os.path.expanduser(dst) if '~' in dst else dst
+
+    fig.tight_layout()
+    fig.savefig(dst)
+
+
+def create_mixed_timeline_plot(res_mixed, dst):
+    timeline = res_mixed['timeline']
+
+    fig, (ax1, ax2) = pylab.subplots(nrows=2, ncols=1, sharex=True, figsize=(5, 5))
+    ax1.plot(timeline['time'], timeline['read_ops_rate'], label='Read ops/sec', c=READ_COLOR)
+    ax1.plot(timeline['time'], timeline['write_ops_rate'], label='Write ops/sec', c=WRITE_COLOR)
+    ax1.set_ylabel('Ops/sec')
+    ax1.set_ylim(0, )
+    ax1.legend(loc='upper right')
+    ax1.grid(True, axis='y')
+
+    ax2.plot(timeline['time'], timeline['throttled_rate'] * 100, label='Throttled', c='r')
+    ax2.plot(timeline['time'], timeline['error_rate'] * 100, label='Errors', c='k')
+    ax2.set_xlabel('Execution Time (sec)')
+    ax2.set_ylabel('% of requests')
+    ax2.set_ylim(0, )
+    ax2.legend(loc='upper right')
+    ax2.grid(True, axis='y')
+
+    dst = os.path.expanduser(dst) if '~' in dst else dst
+
+    fig.tight_layout()
+    fig.savefig(dst)
+    pylab.close(fig)
+
+
+def create_sweep_plot(summary, dst):
+    fig = pylab.figure(figsize=(5, 5))
+    ax = fig.add_subplot(1, 1, 1)
+    # one line style per object size, so the sizes can be told apart
+    for i, (mb_per_file, group) in enumerate(summary.groupby('mb_per_file')):
+        ls = SWEEP_LINESTYLES[i % len(SWEEP_LINESTYLES)]
+        ax.plot(group.workers, group.write_gbs, marker='o', ls=ls, c=WRITE_COLOR, label='Write {} MB'.format(mb_per_file))
+        ax.plot(group.workers, group.read_gbs, marker='s', ls=ls, c=READ_COLOR, label='Read {} MB'.format(mb_per_file))
+
+    ax.set_xscale('log')
+    ax.set_xlabel('Concurrent functions')
+    ax.set_ylabel('Aggregate GB/sec')
+    ax.set_ylim(0, )
+    pylab.legend(loc='upper left')
+    pylab.grid(True, axis='y')
+
+    dst = os.path.expanduser(dst) if '~' in dst else dst
+
+    fig.tight_layout()
+    fig.savefig(dst)
+    pylab.close(fig)
@@ -0,0 +1,98 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import numpy as np
+
+DISTRIBUTIONS = ['uniform', 'zipf', 'hotspot']
+
+OP_OK = 0
+OP_THROTTLED = 1
+OP_ERROR = 2
+
+THROTTLING_MARKERS = ['SlowDown', 'Throttl', 'TooManyRequests', 'RequestLimitExceeded', '503', '429']
+
+
+def key_probabilities(n_keys, distribution, zipf_skew=1.0, hot_fraction=0.1, hot_ops_fraction=0.9):
+    """
+    Returns the probability of accessing each of the n_keys keys
+    """
+    if distribution == 'uniform':
+        return np.full(n_keys, 1.0 / n_keys)
+    if distribution == 'zipf':
+        weights = 1.0 / np.arange(1, n_keys + 1, dtype=np.float64) ** zipf_skew
+        return weights / weights.sum()
+    if distribution == 'hotspot':
+        n_hot = min(max(1, int(n_keys * hot_fraction)), n_keys)
+        probs = np.empty(n_keys)
+        probs[:n_hot] = hot_ops_fraction / n_hot
+        if n_hot < n_keys:
+            probs[n_hot:] = (1.0 - hot_ops_fraction) / (n_keys - n_hot)
+        else:
+            probs[:] = 1.0 / n_keys
+        return probs / probs.sum()
+    raise ValueError('Unknown distribution {}, choose one of {}'.format(distribution, DISTRIBUTIONS))
+
+
+def build_schedule(n_keys, n_ops, read_ratio, distribution, zipf_skew=1.0,
+                   hot_fraction=0.1, hot_ops_fraction=0.9, seed=None):
+    """
+    Builds a schedule of n_ops operations over a keyspace of n_keys keys.
+    Returns an int32 array of key indexes and a bool array which is True
+    for reads and False for writes.
+
+    Popularity ranks are mapped to a random permutation of the keyspace,
+    so the most popular keys are not neighbours in key order.
+    """
+    rng = np.random.default_rng(seed)
+    cdf = np.cumsum(key_probabilities(n_keys, distribution, zipf_skew, hot_fraction, hot_ops_fraction))
+    ranks = np.searchsorted(cdf, rng.random(n_ops) * cdf[-1], side='right')
+    ranks = np.minimum(ranks, n_keys - 1)
+    key_idx = rng.permutation(n_keys).astype(np.int32)[ranks]
+    is_read = rng.random(n_ops) < read_ratio
+    return key_idx, is_read
+
+
+def is_throttling_error(e):
+    msg = '{} {}'.format(type(e).__name__, e)
+    return any(marker in msg for marker in THROTTLING_MARKERS)
+
+
+def ops_timeline(timestamps, statuses, is_read, bin_size=1.0):
+    """
+    Bins completed operations by their completion timestamp (seconds
+    since the start of the run) and returns, for every bin, the read
+    and write throughput and the throttled and error rates.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    statuses = np.asarray(statuses)
+    is_read = np.asarray(is_read, dtype=bool)
+    n_bins = int(np.ceil(timestamps.max() / bin_size)) + 1 if len(timestamps) else 1
+    bins = np.minimum((timestamps // bin_size).astype(np.int64), n_bins - 1)
+
+    def count(mask):
+        return np.bincount(bins[mask], minlength=n_bins)
+
+    ok = statuses == OP_OK
+    total = np.bincount(bins, minlength=n_bins)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        throttled_rate = np.where(total > 0, count(statuses == OP_THROTTLED) / total, 0.0)
+        error_rate = np.where(total > 0, count(statuses == OP_ERROR) / total, 0.0)
+
+    return {'time': np.arange(n_bins) * bin_size,
+            'read_ops_rate': count(ok & is_read) / bin_size,
+            'write_ops_rate': count(ok & ~is_read) / bin_size,
+            'throttled_rate': throttled_rate,
+            'error_rate': error_rate}
@@ -0,0 +1,600 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import time
+import uuid
+import shutil
+import random
+import tempfile
+import threading
+import collections
+import click
+import xml.etree.ElementTree as ET
+from email.utils import formatdate
+from urllib.parse import urlsplit, parse_qs, quote, unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+S3_NS = 'http://s3.amazonaws.com/doc/2006-03-01/'
+BLOCK_SIZE = 64 * 1024
+UPLOADS_DIR = '.uploads'
+
+
+class ConnectionShaper(object):
+    """
+    Paces the bytes sent and received through a connection so that
+    they never exceed the configured bandwidth. Idle time does not
+    accumulate credit, so bursts are not allowed.
+    """
+
+    def __init__(self, bytes_per_sec):
+        self.bytes_per_sec = bytes_per_sec
+        self.next_time = time.monotonic()
+
+    def consume(self, n):
+        if not self.bytes_per_sec:
+            return
+        now = time.monotonic()
+        self.next_time = max(self.next_time, now) + n / self.bytes_per_sec
+        if self.next_time > now:
+            time.sleep(self.next_time - now)
+
+
+class PrefixRateLimiter(object):
+    """
+    Sliding one-second window of the requests received by each key
+    prefix, emulating the per-prefix request rate limits of S3.
+    """
+
+    def __init__(self, max_rps):
+        self.max_rps = max_rps
+        self.windows = collections.defaultdict(collections.deque)
+        self.lock = threading.Lock()
+
+    def allow(self, prefix):
+        if not self.max_rps:
+            return True
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows[prefix]
+            while window and now - window[0] > 1.0:
+                window.popleft()
+            if len(window) >= self.max_rps:
+                return False
+            window.append(now)
+            return True
+
+
+class _BodyReader(object):
+    """
+    Buffered reader on top of a sequence of chunks returned by _fill()
+    """
+
+    def __init__(self):
+        self.buf = b''
+
+    def _fill(self):
+        raise NotImplementedError()
+
+    def read(self, n):
+        if not self.buf:
+            self.buf = self._fill()
+        out, self.buf = self.buf[:n], self.buf[n:]
+        return out
+
+    def read_exactly(self, n):
+        chunks = []
+        while n > 0:
+            chunk = self.read(n)
+            if not chunk:
+                raise IOError('Unexpected end of request body')
+            chunks.append(chunk)
+            n -= len(chunk)
+        return b''.join(chunks)
+
+    def readline(self):
+        while b'\n' not in self.buf:
+            more = self._fill()
+            if not more:
+                break
+            self.buf += more
+        idx = self.buf.find(b'\n')
+        idx = len(self.buf) if idx < 0 else idx + 1
+        line, self.buf = self.buf[:idx], self.buf[idx:]
+        return line
+
+
+class _LengthReader(_BodyReader):
+
+    def __init__(self, rfile, length, shaper):
+        super().__init__()
+        self.rfile = rfile
+        self.remaining = length
+        self.shaper = shaper
+
+    def _fill(self):
+        if self.remaining <= 0:
+            return b''
+        data = self.rfile.read(min(BLOCK_SIZE, self.remaining))
+        if not data:
+            raise IOError('Unexpected end of request body')
+        self.remaining -= len(data)
+        self.shaper.consume(len(data))
+        return data
+
+
+class _HTTPChunkedReader(_BodyReader):
+
+    def __init__(self, rfile, shaper):
+        super().__init__()
+        self.rfile = rfile
+        self.shaper = shaper
+        self.done = False
+
+    def _fill(self):
+        if self.done:
+            return b''
+        size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+        if size == 0:
+            while self.rfile.readline().strip():
+                pass
+            self.done = True
+            return b''
+        data = self.rfile.read(size)
+        self.rfile.readline()
+        self.shaper.consume(len(data))
+        return data
+
+
+class _AwsChunkedReader(_BodyReader):
+    """
+    Decodes the aws-chunked content encoding used by the AWS SDKs
+    for streaming uploads with chunk signatures or trailing checksums.
+    """
+
+    def __init__(self, inner):
+        super().__init__()
+        self.inner = inner
+        self.done = False
+
+    def _fill(self):
+        if self.done:
+            return b''
+        size = int(self.inner.readline().split(b';')[0].strip(), 16)
+        if size == 0:
+            line = self.inner.readline()
+            while line.strip():
+                line = self.inner.readline()
+            self.done = True
+            return b''
+        data = self.inner.read_exactly(size)
+        self.inner.readline()
+        return data
+
+
+class StorageEmulatorServer(ThreadingHTTPServer):
+    """
+    Minimal S3-compatible object storage server, which keeps the
+    objects in a local directory and shapes every request with the
+    configured bandwidth, latency, throttling and error injection.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, data_dir, bandwidth=0, latency=0, latency_jitter=0,
+                 max_prefix_reads=0, max_prefix_writes=0, error_rate=0, seed=None, verbose=False):
+        super().__init__(address, StorageEmulatorHandler)
+        self.data_dir = data_dir
+        self.bandwidth = bandwidth * 1e6
+        self.latency = latency / 1000
+        self.latency_jitter = latency_jitter / 1000
+        self.read_limiter = PrefixRateLimiter(max_prefix_reads)
+        self.write_limiter = PrefixRateLimiter(max_prefix_writes)
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.verbose = verbose
+        self.stats = collections.Counter()
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(data_dir, UPLOADS_DIR), exist_ok=True)
+
+    def count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def request_delay(self):
+        with self.lock:
+            return self.latency + self.random.uniform(0, self.latency_jitter)
+
+    def inject_error(self):
+        if not self.error_rate:
+            return False
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def bucket_path(self, bucket):
+        return os.path.join(self.data_dir, bucket)
+
+    def object_path(self, bucket, key):
+        return os.path.join(self.data_dir, bucket, quote(key, safe=''))
+
+    def upload_path(self, upload_id, part_number=None):
+        path = os.path.join(self.data_dir, UPLOADS_DIR, upload_id)
+        return path if part_number is None else os.path.join(path, str(part_number))
+
+
+def _etag(path):
+    st = os.stat(path)
+    return '"{:x}{:x}"'.format(st.st_mtime_ns, st.st_size)
+
+
+class StorageEmulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'StorageEmulator/1.0'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.shaper = ConnectionShaper(self.server.bandwidth)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_HEAD(self):
+        self.dispatch('HEAD')
+
+    def do_PUT(self):
+        self.dispatch('PUT')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    # Request parsing
+
+    def parse_path(self):
+        url = urlsplit(self.path)
+        path = url.path.lstrip('/')
+        host = self.headers.get('Host', '').split(':')[0]
+        if host.endswith('.localhost'):
+            # virtual-hosted style request
+            bucket, key = host[:-len('.localhost')], path
+        else:
+            bucket, _, key = path.partition('/')
+        query = {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+        return unquote(bucket), unquote(key), query
+
+    def body_reader(self):
+        if 'chunked' in self.headers.get('Transfer-Encoding', ''):
+            reader = _HTTPChunkedReader(self.rfile, self.shaper)
+        else:
+            reader = _LengthReader(self.rfile, int(self.headers.get('Content-Length', 0)), self.shaper)
+        if 'aws-chunked' in self.headers.get('Content-Encoding', '') or \
+           self.headers.get('x-amz-content-sha256', '').startswith('STREAMING-'):
+            reader = _AwsChunkedReader(reader)
+        return reader
+
+    def read_body(self):
+        reader = self.body_reader()
+        chunks = []
+        chunk = reader.read(BLOCK_SIZE)
+        while chunk:
+            chunks.append(chunk)
+            chunk = reader.read(BLOCK_SIZE)
+        return b''.join(chunks)
+
+    def write_body_to(self, path):
+        reader = self.body_reader()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = '{}.{}.tmp'.format(path, uuid.uuid4().hex)
+        with open(tmp_path, 'wb') as f:
+            chunk = reader.read(BLOCK_SIZE)
+            while chunk:
+                f.write(chunk)
+                chunk = reader.read(BLOCK_SIZE)
+        os.replace(tmp_path, path)
+
+    # Responses
+
+    def send_data(self, status, body=b'', headers=None, content_type='application/xml'):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        if self.command != 'HEAD' and body:
+            self.shaper.consume(len(body))
+            self.wfile.write(body)
+
+    def send_xml(self, status, root, content, namespace=S3_NS):
+        xmlns = ' xmlns="{}"'.format(namespace) if namespace else ''
+        body = '<?xml version="1.0" encoding="UTF-8"?>\n<{0}{1}>{2}</{0}>'.format(root, xmlns, content)
+        self.send_data(status, body.encode())
+
+    def send_s3_error(self, status, code, message, resource='', close=True):
+        # the request body may not have been consumed
+        self.close_connection = close
+        self.send_xml(status, 'Error', '<Code>{}</Code><Message>{}</Message><Resource>{}</Resource>'.format(
+            code, escape(message), escape(resource)), namespace=None)
+
+    def send_file(self, path, headers):
+        size = os.path.getsize(path)
+        first, last = 0, size - 1
+        status = 200
+        byte_range = self.headers.get('Range')
+        if byte_range and byte_range.startswith('bytes='):
+            start, _, end = byte_range[len('bytes='):].partition('-')
+            if start:
+                first = int(start)
+                last = min(int(end), size - 1) if end else size - 1
+            else:
+                first = max(size - int(end), 0)
+            if first >= size or first > last:
+                return self.send_s3_error(416, 'InvalidRange', 'The requested range is not satisfiable', close=False)
+            status = 206
+            headers['Content-Range'] = 'bytes {}-{}/{}'.format(first, last, size)
+
+        length = last - first + 1
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'binary/octet-stream')
+        self.send_header('Content-Length', str(length))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+        if self.command == 'HEAD':
+            return
+        with open(path, 'rb') as f:
+            f.seek(first)
+            while length > 0:
+                data = f.read(min(BLOCK_SIZE, length))
+                if not data:
+                    break
+                self.shaper.consume(len(data))
+                self.wfile.write(data)
+                length -= len(data)
+
+    # Request handling
+
+    def dispatch(self, method):
+        bucket, key, query = self.parse_path()
+        self.server.count('requests')
+
+        time.sleep(self.server.request_delay())
+
+        if self.server.inject_error():
+            self.server.count('errors')
+            return self.send_s3_error(500, 'InternalError', 'Injected error', '/{}/{}'.format(bucket, key))
+
+        limiter = self.server.read_limiter if method in ('GET', 'HEAD') else self.server.write_limiter
+        prefix = key.rpartition('/')[0]
+        if key and not limiter.allow((bucket, prefix)):
+            self.server.count('throttled')
+            return self.send_s3_error(503, 'SlowDown', 'Please reduce your request rate.', '/{}/{}'.format(bucket, key))
+
+        try:
+            if not bucket:
+                return self.list_buckets()
+            if not key:
+                return self.handle_bucket(method, bucket, query)
+            return self.handle_object(method, bucket, key, query)
+        except (ConnectionError, BrokenPipeError):
+            self.close_connection = True
+        except Exception as e:
+            self.server.count('errors')
+            self.send_s3_error(500, 'InternalError', str(e))
+
+    def list_buckets(self):
+        buckets = sorted(b for b in os.listdir(self.server.data_dir) if b != UPLOADS_DIR)
+        content = ''.join('<Bucket><Name>{}</Name></Bucket>'.format(escape(b)) for b in buckets)
+        self.send_xml(200, 'ListAllMyBucketsResult', '<Buckets>{}</Buckets>'.format(content))
+
+    def handle_bucket(self, method, bucket, query):
+        path = self.server.bucket_path(bucket)
+
+        if method == 'PUT':
+            self.read_body()
+            os.makedirs(path, exist_ok=True)
+            return self.send_data(200, headers={'Location': '/' + bucket})
+
+        if not os.path.isdir(path):
+            return self.send_s3_error(404, 'NoSuchBucket', 'The specified bucket does not exist', bucket)
+
+        if method == 'HEAD':
+            return self.send_data(200)
+        if method == 'DELETE':
+            shutil.rmtree(path)
+            return self.send_data(204)
+        if method == 'POST' and 'delete' in query:
+            return self.delete_objects(bucket, self.read_body())
+        if method == 'GET':
+            return self.list_objects(bucket, query)
+        self.send_s3_error(501, 'NotImplemented', 'Operation not implemented', bucket)
+
+    def list_objects(self, bucket, query):
+        prefix = query.get('prefix', '')
+        delimiter = query.get('delimiter', '')
+        max_keys = int(query.get('max-keys', 1000))
+        v2 = query.get('list-type') == '2'
+        start_after = query.get('continuation-token') or query.get('start-after', '') if v2 else query.get('marker', '')
+
+        keys = sorted(unquote(f) for f in os.listdir(self.server.bucket_path(bucket)) if not f.endswith('.tmp'))
+        contents, common_prefixes = [], []
+        truncated = False
+        last = start_after
+        for key in keys:
+            if not key.startswith(prefix) or key <= start_after:
+                continue
+            if delimiter and delimiter in key[len(prefix):]:
+                common = key[:key.index(delimiter, len(prefix)) + len(delimiter)]
+                if common_prefixes and common_prefixes[-1] == common:
+                    last = key
+                    continue
+            else:
+                common = None
+            if len(contents) + len(common_prefixes) >= max_keys:
+                truncated = True
+                break
+            last = key
+            if common:
+                common_prefixes.append(common)
+                continue
+            path = self.server.object_path(bucket, key)
+            st = os.stat(path)
+            contents.append('<Contents><Key>{}</Key><LastModified>{}</LastModified><ETag>{}</ETag>'
+                            '<Size>{}</Size><StorageClass>STANDARD</StorageClass></Contents>'.format(
+                                escape(key), time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(st.st_mtime)),
+                                escape(_etag(path)), st.st_size))
+
+        content = '<Name>{}</Name><Prefix>{}</Prefix><MaxKeys>{}</MaxKeys><IsTruncated>{}</IsTruncated>'.format(
+            escape(bucket), escape(prefix), max_keys, 'true' if truncated else 'false')
+        if delimiter:
+            content += '<Delimiter>{}</Delimiter>'.format(escape(delimiter))
+        if v2:
+            content += '<KeyCount>{}</KeyCount>'.format(len(contents) + len(common_prefixes))
+            if truncated:
+                content += '<NextContinuationToken>{}</NextContinuationToken>'.format(escape(last))
+        elif truncated:
+            content += '<NextMarker>{}</NextMarker>'.format(escape(last))
+        content += ''.join(contents)
+        content += ''.join('<CommonPrefixes><Prefix>{}</Prefix></CommonPrefixes>'.format(escape(p))
+                           for p in common_prefixes)
+        self.send_xml(200, 'ListBucketResult', content)
+
+    def delete_objects(self, bucket, body):
+        deleted = []
+        for elem in ET.fromstring(body).iter():
+            if elem.tag.endswith('Key'):
+                key = elem.text or ''
+                try:
+                    os.remove(self.server.object_path(bucket, key))
+                except FileNotFoundError:
+                    pass
+                deleted.append('<Deleted><Key>{}</Key></Deleted>'.format(escape(key)))
+        self.send_xml(200, 'DeleteResult', ''.join(deleted))
+
+    def handle_object(self, method, bucket, key, query):
+        path = self.server.object_path(bucket, key)
+
+        if 'uploadId' in query or 'uploads' in query:
+            return self.handle_multipart(method, bucket, key, query)
+
+        if method == 'PUT':
+            os.makedirs(self.server.bucket_path(bucket), exist_ok=True)
+            self.write_body_to(path)
+            return self.send_data(200, headers={'ETag': _etag(path)})
+
+        if method == 'DELETE':
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return self.send_data(204)
+
+        if method in ('GET', 'HEAD'):
+            if not os.path.isfile(path):
+                if method == 'HEAD':
+                    self.close_connection = False
+                    return self.send_data(404)
+                return self.send_s3_error(404, 'NoSuchKey', 'The specified key does not exist.',
+                                          '/{}/{}'.format(bucket, key), close=False)
+            headers = {'ETag': _etag(path),
+                       'Last-Modified': formatdate(os.path.getmtime(path), usegmt=True)}
+            return self.send_file(path, headers)
+
+        self.send_s3_error(501, 'NotImplemented', 'Operation not implemented', '/{}/{}'.format(bucket, key))
+
+    def handle_multipart(self, method, bucket, key, query):
+        if method == 'POST' and 'uploads' in query:
+            self.read_body()
+            upload_id = uuid.uuid4().hex
+            os.makedirs(self.server.upload_path(upload_id))
+            return self.send_xml(200, 'InitiateMultipartUploadResult',
+                                 '<Bucket>{}</Bucket><Key>{}</Key><UploadId>{}</UploadId>'.format(
+                                     escape(bucket), escape(key), upload_id))
+
+        upload_id = query['uploadId']
+        upload_path = self.server.upload_path(upload_id)
+        if not os.path.isdir(upload_path):
+            return self.send_s3_error(404, 'NoSuchUpload', 'The specified upload does not exist.', upload_id)
+
+        if method == 'PUT':
+            part_path = self.server.upload_path(upload_id, int(query['partNumber']))
+            self.write_body_to(part_path)
+            return self.send_data(200, headers={'ETag': _etag(part_path)})
+
+        if method == 'DELETE':
+            shutil.rmtree(upload_path, ignore_errors=True)
+            return self.send_data(204)
+
+        if method == 'POST':
+            part_numbers = [int(elem.text) for elem in ET.fromstring(self.read_body()).iter()
+                            if elem.tag.endswith('PartNumber')]
+            path = self.server.object_path(bucket, key)
+            os.makedirs(self.server.bucket_path(bucket), exist_ok=True)
+            tmp_path = '{}.{}.tmp'.format(path, upload_id)
+            with open(tmp_path, 'wb') as out:
+                for part_number in part_numbers:
+                    with open(self.server.upload_path(upload_id, part_number), 'rb') as part:
+                        shutil.copyfileobj(part, out, BLOCK_SIZE * 16)
+            os.replace(tmp_path, path)
+            shutil.rmtree(upload_path, ignore_errors=True)
+            return self.send_xml(200, 'CompleteMultipartUploadResult',
+                                 '<Bucket>{}</Bucket><Key>{}</Key><ETag>{}</ETag>'.format(
+                                     escape(bucket), escape(key), escape(_etag(path))))
+
+        self.send_s3_error(501, 'NotImplemented', 'Operation not implemented', '/{}/{}'.format(bucket, key))
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1', help='address to listen on', type=str)
+@click.option('--port', default=9000, help='port to listen on', type=int)
+@click.option('--data_dir', default=None, help='dir to keep the objects in, a temp dir by default')
+@click.option('--bandwidth', default=0, help='MB/s of each connection, 0 for unlimited', type=float)
+@click.option('--latency', default=0, help='ms added to every request', type=float)
+@click.option('--latency_jitter', default=0, help='max random ms added to the latency of every request', type=float)
+@click.option('--max_prefix_reads', default=0, help='GET/HEAD requests per second per key prefix before throttling, 0 for unlimited', type=int)
+@click.option('--max_prefix_writes', default=0, help='PUT/POST/DELETE requests per second per key prefix before throttling, 0 for unlimited', type=int)
+@click.option('--error_rate', default=0, help='fraction of requests failing with an injected 500 error', type=float)
+@click.option('--seed', default=None, help='seed of the latency jitter and error injection', type=int)
+@click.option('--verbose', '-v', is_flag=True, help='log every request')
+def run_emulator(host, port, data_dir, bandwidth, latency, latency_jitter, max_prefix_reads, max_prefix_writes,
+                 error_rate, seed, verbose):
+    if data_dir is None:
+        data_dir = tempfile.mkdtemp(prefix='storage-emulator-')
+    server = StorageEmulatorServer((host, port), data_dir, bandwidth, latency, latency_jitter,
+                                   max_prefix_reads, max_prefix_writes, error_rate, seed, verbose)
+    print('Storage emulator listening on http://{}:{} - Data dir: {}'.format(host, port, data_dir))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print('Requests: {} - Throttled: {} - Errors: {}'.format(
+            server.stats['requests'], server.stats['throttled'], server.stats['errors']))
+
+
+if __name__ == '__main__':
+    run_emulator()
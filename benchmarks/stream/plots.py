@@ -0,0 +1,84 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import os
+import sys
+import pylab
+import logging
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.timeline import timeline
+
+pylab.switch_backend("Agg")
+logger = logging.getLogger(__name__)
+
+STREAM_KERNELS = ['copy', 'scale', 'add', 'triad']
+
+
+def create_bandwidth_histogram(benchmark_data, dst):
+    results_df = pd.DataFrame(benchmark_data['results'])
+
+    fig = pylab.figure(figsize=(5, 5))
+    ax = fig.add_subplot(1, 1, 1)
+    bins = np.linspace(0, results_df[STREAM_KERNELS].max().max()*1.1, 40)
+    for kernel in STREAM_KERNELS:
+        ax.hist(results_df[kernel], bins=bins, histtype='step', linewidth=1.5, label=kernel.capitalize())
+    ax.set_xlabel('GB/sec per worker')
+    ax.set_ylabel('Total functions')
+    ax.legend(loc='upper right')
+    ax.yaxis.grid(True)
+
+    dst = os.path.expanduser(dst) if '~' in dst else dst
+
+    fig.tight_layout()
+    fig.savefig(dst)
+    pylab.close(fig)
+
+
+def create_agg_bdwth_plot(benchmark_data, dst):
+    """
+    Aggregate bandwidth over time, adding the best bandwidth of every
+    worker over the time it ran the kernels
+    """
+    start_time = benchmark_data['start_time']
+    results = benchmark_data['results']
+    tr_start_time = np.array([r['start_time'] for r in results]) - start_time
+    tr_end_time = np.array([r['end_time'] for r in results]) - start_time
+
+    max_seconds = max(int(tr_end_time.max()*1.2), 1)
+    runtime_bins = np.linspace(0, max_seconds, max_seconds)
+
+    fig = pylab.figure(figsize=(5, 5))
+    ax = fig.add_subplot(1, 1, 1)
+    for kernel in STREAM_KERNELS:
+        rates = np.array([r[kernel] for r in results])
+        ax.plot(runtime_bins, timeline(runtime_bins, tr_start_time, tr_end_time, rates), label=kernel.capitalize())
+
+    ax.set_xlabel('Execution Time (sec)')
+    ax.set_ylabel("Aggregate GB/sec")
+    ax.set_xlim(0, )
+    ax.set_ylim(0, )
+    pylab.legend()
+    pylab.grid(True, axis='y')
+
+    dst = os.path.expanduser(dst) if '~' in dst else dst
+
+    fig.tight_layout()
+    fig.savefig(dst)
+    pylab.close(fig)
@@ -0,0 +1,150 @@
+#
+# Copyright Cloudlab URV 2020
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import os
+import sys
+import click
+import time
+import numpy as np
+
+from lithops import FunctionExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.results_log import ResultLog, wait_and_log, load_run, TIMELINE_STATS
+from common.pricing import executor_cost, print_cost
+from common.plots import create_execution_histogram
+from plots import create_bandwidth_histogram, create_agg_bdwth_plot
+
+STREAM_KERNELS = ['copy', 'scale', 'add', 'triad']
+# Bytes moved per array element by every kernel, counted as STREAM does
+STREAM_BYTES = {'copy': 16, 'scale': 16, 'add': 24, 'triad': 24}
+# Elements of the triad temporary, small enough (256KB) to stay in cache,
+# so s*c is not written to and read back from memory
+TRIAD_CHUNK = 32768
+
+
+def array_elements(memory, mem_fraction):
+    """
+    Number of float64 elements of each of the three arrays, so that they
+    take mem_fraction of the function memory
+    """
+    return int(memory * 1024**2 * mem_fraction / (3 * 8))
+
+
+def stream(n, ntimes, scalar=3.0):
+    """
+    Runs ntimes iterations of the STREAM kernels over float64 arrays of n
+    elements and returns the best GB/s of every kernel, excluding the
+    first iteration as STREAM does
+    """
+    a = np.full(n, 1.0)
+    b = np.full(n, 2.0)
+    c = np.zeros(n)
+    tmp = np.empty(min(n, TRIAD_CHUNK))
+
+    def copy():
+        np.copyto(c, a)
+
+    def scale():
+        np.multiply(c, scalar, out=b)
+
+    def add():
+        np.add(a, b, out=c)
+
+    def triad():
+        # numpy has no fused multiply-add, so s*c goes through a cached
+        # temporary, one chunk at a time, to move only the 24 bytes per
+        # element of STREAM instead of 40 with a full size temporary
+        for start in range(0, n, TRIAD_CHUNK):
+            stop = min(start + TRIAD_CHUNK, n)
+            t = tmp[:stop - start]
+            np.multiply(c[start:stop], scalar, out=t)
+            np.add(b[start:stop], t, out=a[start:stop])
+
+    kernels = [('copy', copy), ('scale', scale), ('add', add), ('triad', triad)]
+    times = {name: [] for name in STREAM_KERNELS}
+    start_time = time.time()
+    for i in range(ntimes):
+        for name, kernel in kernels:
+            t0 = time.perf_counter()
+            kernel()
+            times[name].append(time.perf_counter() - t0)
+    end_time = time.time()
+
+    res = {'start_time': start_time, 'end_time': end_time, 'array_mb': n * 8 / 1024**2}
+    for name in STREAM_KERNELS:
+        best = min(times[name][1:] or times[name])
+        res[name] = STREAM_BYTES[name] * n / best / 1e9
+    return res
+
+
+def stream_worker(memory, mem_fraction, ntimes):
+    return stream(array_elements(memory, mem_fraction), ntimes)
+
+
+def benchmark(backend, storage, workers, memory, mem_fraction, ntimes, results_path, debug):
+    iterable = [(memory, mem_fraction, ntimes) for i in range(workers)]
+    log_level = 'INFO' if not debug else 'DEBUG'
+    fexec = FunctionExecutor(backend=backend, storage=storage, runtime_memory=memory, log_level=log_level)
+    start_time = time.time()
+    log = ResultLog(results_path, start_time=start_time, memory=memory, mem_fraction=mem_fraction, ntimes=ntimes)
+    worker_futures = fexec.map(stream_worker, iterable)
+    wait_and_log(fexec, worker_futures, log)
+    end_time = time.time()
+    total_time = end_time-start_time
+
+    print("Total time:", round(total_time, 3))
+    results = [r for r in (f.result(throw_except=False) for f in worker_futures if not f.error) if r is not None]
+    summary = {}
+    for name in STREAM_KERNELS:
+        rates = np.array([r[name] for r in results])
+        summary[name] = {'median_gbs': float(np.median(rates)) if len(rates) else None,
+                         'sum_gbs': float(rates.sum())}
+        print('{} - median GB/s per worker: {} - sum of all workers: {}'.format(
+            name.capitalize(), round(summary[name]['median_gbs'] or 0, 3), round(summary[name]['sum_gbs'], 3)))
+    cost = executor_cost(fexec, worker_futures, memory)
+    print_cost(cost)
+
+    log.close(total_time=total_time, workers=len(results), bandwidth=summary, cost=cost)
+
+    return load_run(results_path, stats_keys=TIMELINE_STATS)
+
+
+def create_plots(data, outdir, name):
+    create_execution_histogram(data, "{}/{}_execution.png".format(outdir, name))
+    create_bandwidth_histogram(data, "{}/{}_bandwidth.png".format(outdir, name))
+    create_agg_bdwth_plot(data, "{}/{}_agg_bdwth.png".format(outdir, name))
+
+
+@click.command()
+@click.option('--backend', '-b', default=None, help='compute backend name', type=str)
+@click.option('--storage', '-s', default=None, help='storage backend name', type=str)
+@click.option('--tasks', default=10, help='how many tasks', type=int)
+@click.option('--memory', default=1024, help='Memory per worker in MB', type=int)
+@click.option('--mem_fraction', default=0.25, help='fraction of the worker memory taken by the three arrays', type=float)
+@click.option('--ntimes', default=10, help='number of times every kernel is run, the best one is reported', type=int)
+@click.option('--outdir', default='.', help='dir to save results in')
+@click.option('--name', help='filename to save results in')
+@click.option('--debug', '-d', is_flag=True, help='debug mode')
+def run_benchmark(backend, storage, tasks, memory, mem_fraction, ntimes, outdir, name, debug):
+    name = '{}_{}mb_stream'.format(tasks, memory) if name is None else name
+    res = benchmark(backend, storage, tasks, memory, mem_fraction, ntimes, f'{outdir}/{name}.jsonl', debug)
+    create_plots(res, outdir, name)
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -3,11 +3,16 @@ from os import path
 from random import sample
 import time
 import json
+import os
+import sys
 
 import click
 from jinja2 import Template
 from lithops import FunctionExecutor
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'benchmarks'))
+from common.pricing import executor_cost, print_cost
+
 size_generators = {
     'test': 10,
     'small': 1000,
@@ -34,17 +39,21 @@ def benchmark(backend, storage, tasks, size, memory, outdir, name, log_level):
     fexec = FunctionExecutor(backend=backend, storage=storage, runtime_memory=memory, log_level=log_level)
 
     start_time = time.time()
-    fexec.map(handler, iterable)
+    futures = fexec.map(handler, iterable)
     results = fexec.get_result(throw_except=False)
     end_time = time.time()
 
     results = [flops for flops in results if flops is not None]
     total_time = end_time-start_time
     print("Total time:", round(total_time, 3))
+    cost = executor_cost(fexec, futures, memory)
+    print_cost(cost)
 
     # Save results to json
     with open('{}/{}.json'.format(outdir, name), 'w') as f:
         json.dump(results, f, indent=4)
+    with open('{}/{}_cost.json'.format(outdir, name), 'w') as f:
+        json.dump(cost, f, indent=4)
     fexec.plot(dst='{}/{}'.format(outdir, name))
 
 
@@ -4,6 +4,7 @@ import io
 import json
 import os
 import random
+import sys
 import time
 import uuid
 
@@ -12,6 +13,9 @@ from PIL import Image
 import click
 from lithops import FunctionExecutor, Storage
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'benchmarks'))
+from common.pricing import executor_cost, print_cost, transferred_gb
+
 
 # Disk-based solution
 # def resize_image(image_path, resized_path, w, h):
@@ -96,17 +100,21 @@ def benchmark(backend, storage_backend, tasks, datadir, bucket_name, inbucket, o
     fexec = FunctionExecutor(backend=backend, storage=storage_backend, runtime_memory=memory, log_level=log_level)
 
     start_time = time.time()
-    fexec.map(handler, iterable)
+    futures = fexec.map(handler, iterable)
     results = fexec.get_result(throw_except=False)
     end_time = time.time()
 
     results = [flops for flops in results if flops is not None]
     total_time = end_time-start_time
     print("Total time:", round(total_time, 3))
+    cost = executor_cost(fexec, futures, memory, gb=transferred_gb(results))
+    print_cost(cost)
 
     # Save results to json
     with open('{}/{}.json'.format(outdir, name), 'w') as f:
         json.dump(results, f, indent=4)
+    with open('{}/{}_cost.json'.format(outdir, name), 'w') as f:
+        json.dump(cost, f, indent=4)
     fexec.plot(dst='{}/{}'.format(outdir, name))
 
 
@@ -2,6 +2,7 @@ import datetime
 import json
 import os
 import random
+import sys
 import time
 import uuid
 
@@ -13,6 +14,9 @@ from torchvision.models import resnet50
 
 from lithops import FunctionExecutor, Storage
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'benchmarks'))
+from common.pricing import executor_cost, print_cost, transferred_gb
+
 
 SCRIPT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__)))
 class_idx = json.load(open(os.path.join(SCRIPT_DIR, "imagenet_class_index.json"), 'r'))
@@ -28,6 +32,7 @@ def handler(model_storage, bucket, input, key):
     image_path = download_path
     storage.download_file(bucket, os.path.join(input, key), image_path)
     image_download_end = datetime.datetime.now()
+    download_size = os.path.getsize(image_path)
 
     global model
     if not model:
@@ -35,6 +40,7 @@ def handler(model_storage, bucket, input, key):
         model_path = os.path.join('/tmp', model_storage)
         storage.download_file(bucket, os.path.join(input, model_storage), model_path)
         model_download_end = datetime.datetime.now()
+        download_size += os.path.getsize(model_path)
         model_process_begin = datetime.datetime.now()
         model = resnet50(pretrained=False)
         model.load_state_dict(torch.load(model_path))
@@ -72,6 +78,7 @@ def handler(model_storage, bucket, input, key):
             'result': {'idx': index.item(), 'class': ret},
             'measurement': {
                 'download_time': download_time + model_download_time,
+                'download_size': download_size,
                 'compute_time': process_time + model_process_time,
                 'model_time': model_process_time,
                 'model_download_time': model_download_time
@@ -112,17 +119,21 @@ def benchmark(backend, storage_backend, tasks, datadir, bucket_name, inbucket, m
     fexec = FunctionExecutor(backend=backend, storage=storage_backend, runtime_memory=memory, log_level=log_level)
 
     start_time = time.time()
-    fexec.map(handler, iterable)
+    futures = fexec.map(handler, iterable)
     results = fexec.get_result(throw_except=False)
     end_time = time.time()
 
     results = [flops for flops in results if flops is not None]
     total_time = end_time-start_time
     print("Total time:", round(total_time, 3))
+    cost = executor_cost(fexec, futures, memory, gb=transferred_gb(results))
+    print_cost(cost)
 
     # Save results to json
     with open('{}/{}.json'.format(outdir, name), 'w') as f:
         json.dump(results, f, indent=4)
+    with open('{}/{}_cost.json'.format(outdir, name), 'w') as f:
+        json.dump(cost, f, indent=4)
     fexec.plot(dst='{}/{}'.format(outdir, name))
 
 
@@ -4,11 +4,15 @@ import io
 import json
 import os
 import random
+import sys
 import time
 import uuid
 
 import click
 from lithops import FunctionExecutor, Storage
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'benchmarks'))
+from common.pricing import executor_cost, print_cost, transferred_gb
 from squiggle import transform
 
 
@@ -19,6 +23,7 @@ def handler(bucket, input_folder, output_folder, key):
     download_begin = datetime.datetime.now()
     storage.download_file(bucket, os.path.join(input_folder, key), download_path)
     download_stop = datetime.datetime.now()
+    download_size = os.path.getsize(download_path)
     data = open(download_path, "r").read()
 
     process_begin = datetime.datetime.now()
@@ -27,6 +32,7 @@ def handler(bucket, input_folder, output_folder, key):
 
     upload_begin = datetime.datetime.now()
     buf = io.BytesIO(json.dumps(result).encode())
+    upload_size = buf.getbuffer().nbytes
     buf.seek(0)
     key_name = os.path.join(output_folder, '{}-{}'.format(uuid.uuid4(), key))
     storage.put_object(bucket, key_name, buf)
@@ -44,8 +50,10 @@ def handler(bucket, input_folder, output_folder, key):
             },
             'measurement': {
                 'download_time': download_time,
+                'download_size': download_size,
                 'compute_time': process_time,
-                'upload_time': upload_time
+                'upload_time': upload_time,
+                'upload_size': upload_size
             }
     }
 
@@ -78,17 +86,21 @@ def benchmark(backend, storage_backend, tasks, datadir, bucket_name, inbucket, o
     fexec = FunctionExecutor(backend=backend, storage=storage_backend, runtime_memory=memory, log_level=log_level)
 
     start_time = time.time()
-    fexec.map(handler, iterable)
+    futures = fexec.map(handler, iterable)
     results = fexec.get_result(throw_except=False)
     end_time = time.time()
 
     results = [flops for flops in results if flops is not None]
     total_time = end_time-start_time
     print("Total time:", round(total_time, 3))
+    cost = executor_cost(fexec, futures, memory, gb=transferred_gb(results))
+    print_cost(cost)
 
     # Save results to json
     with open('{}/{}.json'.format(outdir, name), 'w') as f:
         json.dump(results, f, indent=4)
+    with open('{}/{}_cost.json'.format(outdir, name), 'w') as f:
+        json.dump(cost, f, indent=4)
     fexec.plot(dst='{}/{}'.format(outdir, name))
 
 